@@ -0,0 +1 @@
+"""Scalable puzzle generators and phase timings for sat_utils."""
@@ -0,0 +1,92 @@
+"""Time the build, translate and solve phases across problem sizes.
+
+    $ python -m benchmarks logic_grid --sizes 4 6 8 --encoding seqcounter
+    $ python -m benchmarks field_maps --sizes 10 20 40 --output bench.json
+    $ python -m benchmarks logic_grid --sizes 8 10 --solver "kissat -q"
+"""
+import argparse
+import itertools
+import json
+import logging
+import sys
+import time
+
+from benchmarks import generators
+from examples import sat_utils
+
+
+def _build_logic_grid(size, args):
+    return generators.logic_grid(
+        size, categories=args.categories, seed=args.seed, encoding=args.encoding,  # noqa
+    )
+
+
+def _build_field_maps(size, args):
+    from examples.puzzles import field_maps
+    logging.getLogger("field_maps").setLevel(logging.WARNING)
+    source_fields, target_fields = generators.field_schema(size, seed=args.seed)  # noqa
+    return field_maps.solve_maps(source_fields, target_fields)
+
+
+BUILDERS = {
+    "logic_grid": _build_logic_grid,
+    "field_maps": _build_field_maps,
+}
+
+
+def run(problem, size, args):
+    """Return one machine-readable result for a problem at a size."""
+    start = time.perf_counter()
+    statement = BUILDERS[problem](size, args)
+    built = time.perf_counter()
+    numbered_cnf, num2var = sat_utils.translate(statement)
+    translated = time.perf_counter()
+    backend = sat_utils.DimacsBackend(args.solver) if args.solver else None
+    models = sat_utils.get_backend(backend).itersolve(numbered_cnf)
+    solutions = sum(1 for _ in itertools.islice(models, args.limit))
+    solved = time.perf_counter()
+
+    return {
+        "problem": problem,
+        "size": size,
+        "encoding": args.encoding,
+        "solver": args.solver or sat_utils.DEFAULT_BACKEND,
+        "clauses": len(numbered_cnf),
+        "literals": sum(map(len, numbered_cnf)),
+        "variables": len(num2var) // 2,
+        "solutions": solutions,
+        "build_seconds": built - start,
+        "translate_seconds": translated - built,
+        "solve_seconds": solved - translated,
+    }
+
+
+def main(argv=None):
+    """Run the benchmarks and write one JSON object per line."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("problem", choices=sorted(BUILDERS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 5, 6])
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--encoding", choices=sorted(sat_utils.ENCODINGS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--limit", type=int, default=1000,
+        help="stop enumerating after this many solutions",
+    )
+    parser.add_argument(
+        "--solver", metavar="COMMAND",
+        help="solve with a local DIMACS solver binary instead of pycosat",
+    )
+    parser.add_argument("--output", type=argparse.FileType("w"), default=sys.stdout)  # noqa
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        for _ in range(args.repeat):
+            result = run(args.problem, size, args)
+            args.output.write(json.dumps(result) + "\n")
+            args.output.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Parametric problem generators in the style of the example puzzles."""
+import random
+import string
+
+from examples import sat_utils
+
+
+def _is(subject, category, value):
+    return f"{subject}'s {category} is {value}"
+
+
+def logic_grid(size, categories=3, clues=None, seed=0, encoding=None):
+    """Return a satisfiable size x size logic grid statement.
+
+    Like aerophobes, every subject takes exactly one value per category and
+    every value belongs to exactly one subject. Clues are drawn from a
+    hidden random solution so the grid is always solvable: "X is not V"
+    facts, and "whoever is V in one category is W in another" links.
+    """
+    rng = random.Random(seed)
+    subjects = [f"S{i}" for i in range(size)]
+    grid = {
+        f"C{c}": [f"V{c}_{v}" for v in range(size)]
+        for c in range(categories)
+    }
+    answer = {
+        category: dict(zip(subjects, rng.sample(values, size)))
+        for category, values in grid.items()
+    }
+
+    statement = list()
+    for category, values in grid.items():
+        for subject in subjects:
+            statement += sat_utils.one_of(
+                (_is(subject, category, value) for value in values),
+                encoding=encoding,
+            )
+        for value in values:
+            statement += sat_utils.one_of(
+                (_is(subject, category, value) for subject in subjects),
+                encoding=encoding,
+            )
+
+    if clues is None:
+        clues = size * categories
+    names = list(grid)
+    for _ in range(clues):
+        subject = rng.choice(subjects)
+        category = rng.choice(names)
+        if len(names) > 1 and rng.random() < 0.5:
+            other = rng.choice([n for n in names if n != category])
+            value, other_value = answer[category][subject], answer[other][subject]  # noqa
+            for s in subjects:
+                statement += [
+                    (sat_utils.neg(_is(s, category, value)), _is(s, other, other_value)),  # noqa
+                    (_is(s, category, value), sat_utils.neg(_is(s, other, other_value))),  # noqa
+                ]
+        else:
+            wrong = [v for v in grid[category] if v != answer[category][subject]]  # noqa
+            if wrong:
+                statement += [
+                    (sat_utils.neg(_is(subject, category, rng.choice(wrong))),)  # noqa
+                ]
+
+    return statement
+
+
+def _label(rng, words=2):
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+        for _ in range(words)
+    )
+
+
+def _perturb(rng, label):
+    """Return a target label that is recognisably the same field."""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return label.upper()
+    if choice == 1:
+        return label.replace(" ", "_")
+    position = rng.randrange(len(label))
+    return label[:position] + label[position + 1:]
+
+
+def field_schema(size, matched=0.6, seed=0):
+    """Return (source_fields, target_fields) for solve_maps.
+
+    About `matched` of the source fields have a perturbed counterpart in the
+    targets; the rest of both schemas is random noise.
+    """
+    from examples.puzzles.field_maps import Field
+
+    rng = random.Random(seed)
+    sources = [_label(rng) for _ in range(size)]
+    targets = [_perturb(rng, label) for label in sources if rng.random() < matched]  # noqa
+    targets += [_label(rng) for _ in range(size - len(targets))]
+    rng.shuffle(targets)
+    return [Field(label) for label in sources], [Field(label) for label in targets]  # noqa
@@ -1,56 +1,142 @@
 """Experimentation to the pycosat SAT Solver w/ Hettinger's utils."""
+import argparse
+import contextlib
 import datetime
+import json
 import sys
 
 from examples import sat_utils
 from examples import _readable_cnf
-from examples.puzzles import simple_lunch
-from examples.puzzles import comets
-from examples.puzzles import field_maps
-from examples.puzzles import tfinley
-from examples.puzzles import aerophobes
+from examples import puzzles
 
 
-puzzles = {
-    "simple_lunch": simple_lunch.simple_lunch,
-    "comets": comets.comets,
-    "field_maps": field_maps.solve_maps,
-    "tfinley": tfinley.tfinley,
-    "aerophobes": aerophobes.aerophobes,
-}
+def _print_solutions(all_solutions):
+    print('\nSolutions\n--------')
+    for num, solution in enumerate(all_solutions, start=1):
+        print(f"Solution #{num}")
+        print(_readable_cnf(sorted(solution), separator="\n"))
+        print("\n\n")
 
 
-if __name__ == "__main__":
+@contextlib.contextmanager
+def _profiled(limit, stream=sys.stderr):
+    """Dump the hottest functions and allocation sites after the block."""
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        print(output.getvalue(), file=stream)
+
+        print("Top allocations\n--------", file=stream)
+        for stat in snapshot.statistics("lineno")[:limit]:
+            print(stat, file=stream)
+
+
+def main(argv=None):
+    """Solve a puzzle, optionally reporting metrics and a profile."""
+    parser = argparse.ArgumentParser(prog="python -m examples")
+    parser.add_argument("puzzle", nargs="?", default="simple_lunch")
+    parser.add_argument(
+        "--metrics", choices=("text", "json"),
+        help="report clause/literal/variable counts, time and peak memory per phase",  # noqa
+    )
+    parser.add_argument(
+        "--profile", type=int, nargs="?", const=25, metavar="N",
+        help="profile with cProfile and tracemalloc; show the top N entries",  # noqa
+    )
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="reuse solutions from earlier runs; pays off for slow solves",
+    )
+    parser.add_argument(
+        "--solver", metavar="COMMAND",
+        help="solve with a local DIMACS solver binary instead of pycosat",
+    )
+    parser.add_argument(
+        "--count", action="store_true",
+        help="print how many solutions there are instead of listing them",
+    )
+    parser.add_argument(
+        "--backbone", action="store_true",
+        help="print what every solution agrees on instead of listing them",
+    )
+    args = parser.parse_args(argv)
+    backend = sat_utils.DimacsBackend(args.solver) if args.solver else None
+
     try:
-        _filename, puzzle_name, *_etc = sys.argv
-        puzzle = puzzles[puzzle_name]
-    except ValueError:
-        puzzle = puzzles["simple_lunch"]
+        puzzle = puzzles.get(args.puzzle)
     except KeyError:
-        print(f"Puzzle by name of {puzzle_name!r} does not exist.")
+        print(f"Puzzle by name of {args.puzzle!r} does not exist.")
         exit()
 
-    start_compose_statement = datetime.datetime.now()
-    statement = puzzle()
-    end_compose_statement = datetime.datetime.now()
+    if args.count:
+        print(sat_utils.count_solutions(puzzle()))
+        return
 
-    # print("Statement\n--------")
-    # cnf_statement_lines = ["    AND"] * ((len(statement) * 2) - 1)
-    # cnf_statement_lines[0::2] = [_readable_cnf(c) for c in statement]
-    # for line in cnf_statement_lines:
-    #     print(line)
+    if args.backbone:
+        forced = sat_utils.backbone(puzzle(), backend=backend)
+        if forced is None:
+            print("The puzzle has no solutions.")
+        else:
+            print(_readable_cnf(forced, separator="\n"))
+        return
 
-    print("\nCalculating solutions...\n")
+    profiling = _profiled(args.profile) if args.profile else contextlib.nullcontext()  # noqa
 
-    start_solve_all = datetime.datetime.now()
-    all_solutions = sat_utils.solve_all(statement)
-    end_solve_all = datetime.datetime.now()
-    print('\nSolutions\n--------')
-    for num, solution in enumerate(all_solutions, start=1):
-        print(f"Solution #{num}")
-        print(_readable_cnf(sorted(solution), separator="\n"))
-        print("\n\n")
+    if args.metrics:
+        from examples import metrics
+        with profiling:
+            all_solutions, run_metrics = metrics.solve_all(puzzle, backend=backend)  # noqa
+        if args.metrics == "json":
+            document = run_metrics.as_dict()
+            document.update(puzzle=args.puzzle, solutions=len(all_solutions))
+            print(json.dumps(document, indent=2))
+        else:
+            _print_solutions(all_solutions)
+            print(run_metrics)
+        return
+
+    with profiling:
+        start_compose_statement = datetime.datetime.now()
+        statement = puzzle()
+        end_compose_statement = datetime.datetime.now()
+
+        # print("Statement\n--------")
+        # cnf_statement_lines = ["    AND"] * ((len(statement) * 2) - 1)
+        # cnf_statement_lines[0::2] = [_readable_cnf(c) for c in statement]
+        # for line in cnf_statement_lines:
+        #     print(line)
+
+        print("\nCalculating solutions...\n")
+
+        start_solve_all = datetime.datetime.now()
+        if args.cache:
+            from examples import cache
+            all_solutions = cache.CNFCache().solve_all(statement, backend=backend)  # noqa
+        else:
+            all_solutions = sat_utils.solve_all(statement, backend=backend)
+        end_solve_all = datetime.datetime.now()
+
+    _print_solutions(all_solutions)
 
     print(f"Statement Composition: {end_compose_statement - start_compose_statement}")  # noqa
     print(f"Solve Time: {end_solve_all - start_solve_all}")
     print(f"Total Runtime: {end_solve_all - start_compose_statement}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Solve statements from asyncio code without blocking the event loop.
+
+Each solve runs in its own worker process, so a timeout or cancellation
+can kill a hard instance outright instead of leaving pycosat spinning.
+
+    >>> result = await aio.solve_all(statement, timeout=5)
+    >>> result.status, len(result.solutions), result.complete
+    ('SAT', 12, True)
+"""
+import asyncio
+from itertools import islice
+import multiprocessing
+from typing import NamedTuple
+
+import pycosat
+
+from examples import sat_utils
+
+
+SAT, UNSAT, UNKNOWN = "SAT", "UNSAT", "UNKNOWN"
+
+# Forking a process that runs an event loop and executor threads is unsafe
+_CONTEXT = multiprocessing.get_context("spawn")
+
+
+class Result(NamedTuple):
+    """The outcome of an asynchronous solve.
+
+    status is SAT once any solution is found, UNSAT when the statement is
+    proven unsatisfiable and UNKNOWN when the solve stopped before either.
+    complete is True only if every solution was enumerated.
+    """
+
+    status: str
+    solutions: list
+    complete: bool
+
+
+def _worker(sender, cnf, include_neg, prop_limit, verbose, limit):
+    """Solve in a child process, sending solutions back as they're found."""
+    numbered_cnf, num2var = sat_utils.translate(cnf)
+    status, complete, found = UNSAT, True, 0
+
+    if prop_limit:
+        # pycosat.itersolve stops silently at the limit, so block by hand
+        def models():
+            nonlocal complete
+            clauses = list(numbered_cnf)
+            while True:
+                model = pycosat.solve(
+                    clauses, prop_limit=prop_limit, verbose=verbose,
+                )
+                if model == UNKNOWN:
+                    complete = False
+                if isinstance(model, str):
+                    return
+                yield model
+                clauses.append([-n for n in model])
+    else:
+        def models():
+            return pycosat.itersolve(numbered_cnf, verbose=verbose)
+
+    for model in islice(models(), limit):
+        sender.send((
+            "solution",
+            [
+                num2var[n] for n in model
+                if (include_neg or n > 0) and not sat_utils.is_aux(num2var[n])  # noqa
+            ],
+        ))
+        status, found = SAT, found + 1
+
+    if limit is not None and found == limit:
+        complete = False                # There may have been more
+    if status == UNSAT and not complete:
+        status = UNKNOWN
+    sender.send(("done", (status, complete)))
+    sender.close()
+
+
+def _receive(receiver, solutions):
+    """Collect solutions until the worker is done; None if it went away."""
+    try:
+        while True:
+            kind, value = receiver.recv()
+            if kind == "done":
+                return value
+            solutions.append(value)
+    except EOFError:
+        return None
+
+
+async def _solve(cnf, include_neg, timeout, prop_limit, verbose, limit):
+    loop = asyncio.get_running_loop()
+    receiver, sender = _CONTEXT.Pipe(duplex=False)
+    process = _CONTEXT.Process(
+        target=_worker,
+        args=(sender, list(cnf), include_neg, prop_limit, verbose, limit),
+        daemon=True,
+    )
+    process.start()
+    sender.close()
+
+    solutions = list()
+    reader = loop.run_in_executor(None, _receive, receiver, solutions)
+
+    def cleanup(_reader):
+        receiver.close()
+        loop.run_in_executor(None, process.join)
+
+    reader.add_done_callback(cleanup)
+    killed = False
+    try:
+        outcome = await asyncio.wait_for(asyncio.shield(reader), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        killed = True
+        outcome = await reader          # Returns now the worker is gone
+    finally:
+        if process.is_alive() and not killed:   # Cancelled
+            process.kill()
+
+    if outcome is None:
+        if not killed:
+            raise RuntimeError("Solver process exited without a result")
+        return Result(SAT if solutions else UNKNOWN, solutions, False)
+    status, complete = outcome
+    return Result(status, solutions, complete)
+
+
+async def solve_one(cnf, include_neg=False, *, timeout=None, prop_limit=0, verbose=0):  # noqa
+    """Find a solution in a worker process.
+
+    timeout is in wall-clock seconds and prop_limit caps the propagations
+    pycosat may spend; either way the Result is UNKNOWN if it runs out.
+    Cancelling the awaiting task kills the worker.
+    """
+    return await _solve(cnf, include_neg, timeout, prop_limit, verbose, 1)
+
+
+async def solve_all(cnf, include_neg=False, *, timeout=None, prop_limit=0, verbose=0, limit=None):  # noqa
+    """Enumerate solutions in a worker process.
+
+    Solutions found before a timeout, or before any one solver call runs
+    past prop_limit propagations, are kept in the Result. limit stops
+    after that many solutions.
+    """
+    return await _solve(cnf, include_neg, timeout, prop_limit, verbose, limit)
@@ -0,0 +1,248 @@
+"""Persistent on-disk cache of translated statements and their solutions."""
+from array import array
+import hashlib
+import os
+import re
+import struct
+import sys
+import zlib
+
+from examples import sat_utils
+
+
+MAGIC = b"SATCNF2\n"
+_LAYOUT_SIZE = 20
+_HEADER = struct.Struct("<IIII")
+_NO_SOLUTIONS = 0xFFFFFFFF
+
+DEFAULT_DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "sat_examples",
+)
+
+
+# Auxiliary variables start with AUX_PREFIX; a leading literal search is
+# far faster than anchoring the pattern at literal boundaries
+_AUX = re.compile(rf"{re.escape(sat_utils.AUX_PREFIX)}[^\0\n]*")
+
+
+def _sub_aux(replace, text):
+    """Replace each auxiliary variable in clauses joined by "\0" and "\n"."""
+    def checked(match):
+        start = match.start()
+        start -= text[start - 1:start] == "~"
+        if text[start - 1:start] not in ("", "\0", "\n"):
+            return match.group()        # Part of another variable's name
+        return replace(match.group())
+
+    return _AUX.sub(checked, text)
+
+
+def _digests(cnf):
+    """Return (key, layout) digests of a symbolic cnf.
+
+    Auxiliary names come from a process-wide counter, so the same puzzle
+    built twice gets different ones. The layout renames them in order of
+    first use and hashes the clauses as given, which pins the statement
+    down exactly. The key hashes the distinct literals, with auxiliaries
+    written as "#", and the sorted clause lengths: it ignores clause and
+    literal order, but different statements over the same literals can
+    share it. Both leave the work per literal to str and
+    re methods.
+    """
+    cnf = cnf if isinstance(cnf, list) else list(cnf)
+    names = dict()
+
+    def rename(var):
+        return names.setdefault(var, f"#{len(names) + 1}")
+
+    text = _sub_aux(rename, "\n".join("\0".join(clause) for clause in cnf))
+    masked = _sub_aux(lambda var: "#", text).replace("\n", "\0")
+    key = hashlib.blake2b(digest_size=20)
+    key.update("\0".join(sorted(set(masked.split("\0")))).encode())
+    key.update(_to_bytes(sorted(map(len, cnf)), "I"))
+    layout = hashlib.blake2b(text.encode(), digest_size=_LAYOUT_SIZE)
+    return key.hexdigest(), layout.digest()
+
+
+def fingerprint(cnf):
+    """Return a hex digest of a symbolic cnf, independent of clause order."""
+    return _digests(cnf)[0]
+
+
+def _to_bytes(values, typecode):
+    values = array(typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(data, typecode):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def dumps(numbered_cnf, num2var, solutions=None, layout=None):
+    """Pack a translated statement (and full numbered models) into bytes.
+
+    layout is the statement's layout digest, checked when it is loaded.
+    """
+    layout = layout or bytes(_LAYOUT_SIZE)
+    num_vars = len(num2var) // 2
+    lengths = [len(clause) for clause in numbered_cnf]
+    literals = [lit for clause in numbered_cnf for lit in clause]
+    names = "\0".join(num2var[num] for num in range(1, num_vars + 1))
+    row = (num_vars + 7) // 8
+
+    parts = [
+        _HEADER.pack(
+            len(lengths), len(literals), num_vars,
+            _NO_SOLUTIONS if solutions is None else len(solutions),
+        ),
+        _to_bytes(lengths, "I"),
+        _to_bytes(literals, "i"),
+    ]
+    for solution in solutions or ():
+        bits = sum(1 << (n - 1) for n in solution if n > 0)
+        parts.append(bits.to_bytes(row, "little"))
+    parts.append(names.encode())
+    return MAGIC + layout + zlib.compress(b"".join(parts))
+
+
+def loads(data):
+    """Unpack bytes from `dumps` into (numbered_cnf, num2var, solutions)."""
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a cached statement")
+    payload = zlib.decompress(data[len(MAGIC) + _LAYOUT_SIZE:])
+    num_clauses, num_literals, num_vars, num_solutions = _HEADER.unpack_from(payload)  # noqa
+    offset = _HEADER.size
+
+    lengths = _from_bytes(payload[offset:offset + 4 * num_clauses], "I")
+    offset += 4 * num_clauses
+    literals = _from_bytes(payload[offset:offset + 4 * num_literals], "i")
+    offset += 4 * num_literals
+
+    numbered_cnf, start = list(), 0
+    for length in lengths:
+        numbered_cnf.append(tuple(literals[start:start + length]))
+        start += length
+
+    solutions = None
+    if num_solutions != _NO_SOLUTIONS:
+        row = (num_vars + 7) // 8
+        solutions = list()
+        for _ in range(num_solutions):
+            bits = int.from_bytes(payload[offset:offset + row], "little")
+            offset += row
+            solutions.append([
+                num if bits >> (num - 1) & 1 else -num
+                for num in range(1, num_vars + 1)
+            ])
+
+    num2var = dict()
+    names = payload[offset:].decode().split("\0") if num_vars else []
+    for num, var in enumerate(names, start=1):
+        num2var[num], num2var[-num] = var, "~" + var
+    return numbered_cnf, num2var, solutions
+
+
+class CNFCache:
+    """Directory of compiled statements keyed by their `fingerprint`.
+
+    Each entry also records its statement's layout, and a lookup with a
+    different layout is a miss, so statements sharing a key never share
+    solutions. The same statement built in another clause order misses
+    too; it is solved again and replaces the entry.
+
+    Fingerprinting and loading an entry costs about as much as reading
+    the statement, which is more than `sat_utils.translate` and about
+    what pycosat needs for a small puzzle. So there's no cached
+    translate, and the cache pays off for statements that are slow to
+    solve or have many solutions.
+
+    Entries are evicted least recently used first once the directory grows
+    past max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=256 * 2**20):
+        """Init a CNFCache, creating its directory if needed."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.cnf.z")
+
+    def get(self, key, layout=None):
+        """Return (numbered_cnf, num2var, solutions) or None if not cached.
+
+        With a layout digest, an entry stored for another layout is a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            stored = data[len(MAGIC):len(MAGIC) + _LAYOUT_SIZE]
+            if layout is not None and stored != layout:
+                return None
+            entry = loads(data)
+        except (FileNotFoundError, ValueError, zlib.error, struct.error):
+            return None
+        os.utime(path)                  # Mark as recently used
+        return entry
+
+    def put(self, key, numbered_cnf, num2var, solutions=None, layout=None):
+        """Store a compiled statement, then evict down to max_bytes."""
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(dumps(numbered_cnf, num2var, solutions, layout))
+        os.replace(temporary, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until under max_bytes."""
+        entries = list()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".cnf.z"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        """Delete every cached entry."""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".cnf.z"):
+                os.remove(entry.path)
+
+    def solve_all(self, cnf, include_neg=False, backend=None):
+        """Return `sat_utils.solve_all(cnf)`, solving only on a miss."""
+        key, layout = _digests(cnf)
+        entry = self.get(key, layout)
+        if entry is None or entry[2] is None:
+            if entry is None:
+                numbered_cnf, num2var = sat_utils.translate(cnf)
+            else:
+                numbered_cnf, num2var, _solutions = entry
+            backend = sat_utils.get_backend(backend)
+            solutions = list(backend.itersolve(numbered_cnf))
+            self.put(key, numbered_cnf, num2var, solutions, layout)
+        else:
+            numbered_cnf, num2var, solutions = entry
+        return [
+            [
+                num2var[n] for n in solution
+                if (include_neg or n > 0) and not sat_utils.is_aux(num2var[n])
+            ]
+            for solution in solutions
+        ]
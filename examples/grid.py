@@ -0,0 +1,229 @@
+"""Logic grids: subjects that each take one value from every category.
+
+    >>> grid = LogicGrid(("Ann", "Bob"), pet=("cat", "dog"))
+    >>> statement = grid.statement()
+    >>> statement += [(grid("Ann", "pet", "dog"),)]
+    >>> [grid.records(solution) for solution in sat_utils.solve_all(statement)]  # noqa
+    [[Record(subject='Ann', pet='dog'), Record(subject='Bob', pet='cat')]]
+
+Clues compile once per grid and are spliced into statements after that:
+
+    >>> @Clue
+    ... def bob_has_the_dog(statement):
+    ...     statement += [(grid("Bob", "pet", "dog"),)]
+    >>> len(sat_utils.solve_all(grid.assemble(bob_has_the_dog)))
+    1
+"""
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+import functools
+from typing import NamedTuple
+
+from examples import sat_utils
+
+
+class LogicGrid:
+    """A dense variable index over (subject, category, value) triples.
+
+    Every subject takes exactly one value from each category. A category
+    with as many values as subjects is a bijection; with more values, each
+    value is used at most once; with fewer, values are shared.
+
+    formatters maps a category to a callable(subject, value) naming its
+    variables, so clues read naturally and solutions stay readable; other
+    categories are named "{subject} {category} {value}".
+    """
+
+    def __init__(self, subjects, *, formatters=None, encoding=None, **categories):  # noqa
+        """Index the grid; the bijection constraints are built on first use."""
+        self.subjects = tuple(subjects)
+        self.categories = {
+            category: tuple(values) for category, values in categories.items()
+        }
+        self.encoding = encoding
+        self.Record = namedtuple("Record", ("subject", *self.categories))
+
+        self._subject_index = {s: i for i, s in enumerate(self.subjects)}
+        self._value_index = {
+            category: {v: i for i, v in enumerate(values)}
+            for category, values in self.categories.items()
+        }
+        # Variables are numbered category by category, subject-major within
+        self._names = list(self.categories)
+        self._position = {c: i for i, c in enumerate(self._names)}
+        self._offsets, offset = list(), 0
+        for values in self.categories.values():
+            self._offsets.append(offset)
+            offset += len(self.subjects) * len(values)
+        self.num_vars = offset
+
+        formatters = formatters or dict()
+        self._formatters = [
+            formatters.get(category, self._default_formatter(category))
+            for category in self._names
+        ]
+        self.names = [self.key(num) for num in range(1, self.num_vars + 1)]
+        self.name2num = {name: num for num, name in enumerate(self.names, 1)}  # noqa
+        self._template = None
+        self._key = (
+            self.subjects,
+            tuple(self.categories.items()),
+            tuple(formatters.get(category) for category in self._names),
+            encoding,
+        )
+
+    def __eq__(self, other):
+        """Grids with the same subjects, categories and names are equal."""
+        if not isinstance(other, LogicGrid):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    @staticmethod
+    def _default_formatter(category):
+        return lambda subject, value: f"{subject} {category} {value}"
+
+    def index(self, subject, category, value):
+        """Return the dense variable number of a triple, counting from 1."""
+        values = self._value_index[category]
+        position = self._position[category]
+        return (
+            self._offsets[position]
+            + self._subject_index[subject] * len(values)
+            + values[value]
+            + 1
+        )
+
+    def triple(self, num):
+        """Return the (subject, category, value) a variable number stands for."""  # noqa
+        position = bisect_right(self._offsets, num - 1) - 1
+        category = self._names[position]
+        values = self.categories[category]
+        subject, value = divmod(num - 1 - self._offsets[position], len(values))  # noqa
+        return self.subjects[subject], category, values[value]
+
+    def key(self, num):
+        """Return the variable name a number stands for."""
+        subject, category, value = self.triple(num)
+        return self._formatters[self._position[category]](subject, value)
+
+    def __call__(self, subject, category, value):
+        """Return the variable name of a triple, for use in clauses."""
+        return self.names[self.index(subject, category, value) - 1]
+
+    def constraints(self):
+        """Yield the clauses every solution of the grid must satisfy."""
+        for category, values in self.categories.items():
+            # Each subject takes exactly one value
+            for subject in self.subjects:
+                yield from sat_utils.one_of(
+                    (self(subject, category, value) for value in values),
+                    encoding=self.encoding,
+                )
+            if len(values) < len(self.subjects):
+                continue
+            # ...and no value goes to two subjects
+            for value in values:
+                column = [self(subject, category, value) for subject in self.subjects]  # noqa
+                if len(values) == len(self.subjects):
+                    yield from sat_utils.one_of(column, encoding=self.encoding)  # noqa
+                else:
+                    yield from sat_utils.at_most(column, 1, encoding=self.encoding)  # noqa
+
+    def statement(self):
+        """Return a new CNFBuffer holding the grid constraints.
+
+        The constraints are encoded once per grid and copied, and the
+        buffer numbers the grid variables in index order.
+        """
+        if self._template is None:
+            template = sat_utils.CNFBuffer()
+            template.declare(self.names)
+            template += self.constraints()
+            self._template = template
+        return self._template.copy()
+
+    def compile(self, clue):
+        """Return the clauses a clue adds to this grid, cached as a Fragment."""  # noqa
+        return compile_clue(clue, self)
+
+    def assemble(self, *clues):
+        """Return a statement of the grid constraints and the given clues."""
+        statement = self.statement()
+        for clue in clues:
+            statement.splice(*self.compile(clue))
+        return statement
+
+    def records(self, solution):
+        """Decode a solution into one Record per subject, in subject order.
+
+        solution may be the variable names solve_all() returns or a
+        numbered model over a statement() buffer. Categories a subject
+        has no value for are None.
+        """
+        rows = [dict.fromkeys(self.categories) for _ in self.subjects]
+        for literal in solution:
+            num = literal if isinstance(literal, int) else self.name2num.get(literal)  # noqa
+            if num is None or not 0 < num <= self.num_vars:
+                continue
+            subject, category, value = self.triple(num)
+            rows[self._subject_index[subject]][category] = value
+        return [
+            self.Record(subject, **row)
+            for subject, row in zip(self.subjects, rows)
+        ]
+
+
+# Compiled clues kept per (clue, grid); the least recently used go first
+CLUE_CACHE_SIZE = 512
+
+
+class Fragment(NamedTuple):
+    """Numbered clauses of one clue, where num n stands for variables[n - 1].
+
+    The grid variables come first, in index order, so a fragment splices
+    into a statement() buffer without renumbering them.
+    """
+
+    literals: array
+    variables: tuple
+
+
+class Clue:
+    """A clue function, statement -> None, that adds clauses to a grid.
+
+    Calling a Clue still runs the function on a statement. Compiling it
+    against a LogicGrid runs the function once per grid and caches the
+    resulting Fragment, keyed by the clue and the grid's parameters.
+    """
+
+    def __init__(self, function):
+        """Wrap a clue function, keeping its name and docstring."""
+        self.function = function
+        functools.update_wrapper(self, function)
+
+    def __call__(self, statement):
+        """Add the clue's clauses to statement."""
+        return self.function(statement)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.__name__})"
+
+    def compile(self, grid):
+        """Return the clue's Fragment for a grid."""
+        return compile_clue(self, grid)
+
+
+@functools.lru_cache(maxsize=CLUE_CACHE_SIZE)
+def compile_clue(clue, grid):
+    """Run a clue against an empty buffer numbered like grid.statement()."""
+    buffer = sat_utils.CNFBuffer()
+    buffer.declare(grid.names)
+    clue(buffer)
+    variables = tuple(
+        buffer.num2var[num] for num in range(1, len(buffer.num2var) // 2 + 1)
+    )
+    return Fragment(buffer.literals, variables)
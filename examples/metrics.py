@@ -0,0 +1,164 @@
+"""Structured per-phase metrics for composing and solving statements."""
+from contextlib import contextmanager
+import contextvars
+import itertools
+import json
+import time
+import tracemalloc
+
+
+from examples import sat_utils
+
+
+_active = contextvars.ContextVar("metrics", default=None)
+
+
+class Phase:
+    """Measurements for one named phase of work."""
+
+    def __init__(self, name, depth=0):
+        """Init an empty Phase."""
+        self.name = name
+        self.depth = depth
+        self.seconds = None
+        self.peak_bytes = None
+        self.clauses = None
+        self.literals = None
+        self.variables = None
+        self.solutions = None
+
+    def measure(self, cnf):
+        """Count the clauses, literals and variables of a (numbered) cnf."""
+        variables = set()
+        self.clauses = self.literals = 0
+        for clause in cnf:
+            self.clauses += 1
+            self.literals += len(clause)
+            variables.update(
+                abs(lit) if isinstance(lit, int) else lit.lstrip("~")
+                for lit in clause
+            )
+        self.variables = len(variables)
+
+    def as_dict(self):
+        """Return the Phase as a JSON-friendly dict."""
+        return dict(vars(self))
+
+    def __repr__(self):
+        """Return repr of Phase instance."""
+        return f"<Phase(name={self.name!r}, seconds={self.seconds})>"
+
+
+class Metrics:
+    """Collects Phases; entering it makes it the target of `phase()`."""
+
+    def __init__(self, trace_memory=True):
+        """Init Metrics, optionally tracking peak memory with tracemalloc."""
+        self.trace_memory = trace_memory
+        self.phases = list()
+        self._stack = list()
+        self._started_tracing = False
+        self._token = None
+
+    def __enter__(self):
+        """Activate these Metrics for the current context."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        """Deactivate these Metrics."""
+        _active.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name, cnf=None):
+        """Time a phase; clauses appended to `cnf` during it are measured."""
+        phase = Phase(name, depth=len(self._stack))
+        self.phases.append(phase)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak_bytes = max(parent.peak_bytes, tracemalloc.get_traced_memory()[1])  # noqa
+            tracemalloc.reset_peak()
+            phase.peak_bytes = 0
+        before = len(cnf) if cnf is not None else None
+        self._stack.append(phase)
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            self._stack.pop()
+            if tracing:
+                phase.peak_bytes = max(phase.peak_bytes, tracemalloc.get_traced_memory()[1])  # noqa
+            if before is not None and phase.clauses is None:
+                phase.measure(itertools.islice(cnf, before, None))
+
+    def as_dict(self):
+        """Return every phase as a JSON-friendly dict."""
+        return {"phases": [phase.as_dict() for phase in self.phases]}
+
+    def to_json(self, **kwargs):
+        """Return the metrics as a JSON document."""
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def __str__(self):
+        """Return a human readable table of the phases."""
+        lines = list()
+        for phase in self.phases:
+            counts = ", ".join(
+                f"{key}={getattr(phase, key)}"
+                for key in ("clauses", "literals", "variables", "solutions", "peak_bytes")  # noqa
+                if getattr(phase, key) is not None
+            )
+            name = "  " * phase.depth + phase.name
+            lines.append(f"{name:<30} {phase.seconds:10.6f}s  {counts}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def phase(name, cnf=None):
+    """Record a phase into the active Metrics, if there are any."""
+    metrics = _active.get()
+    if metrics is None:
+        yield None
+        return
+    with metrics.phase(name, cnf) as phase:
+        yield phase
+
+
+def solve_all(build, trace_memory=True, backend=None):
+    """Build, translate, solve and decode a statement, measuring each phase.
+
+    Return the solutions (as `sat_utils.solve_all` would) and the Metrics.
+    """
+    with Metrics(trace_memory) as metrics:
+        with metrics.phase("build") as build_phase:
+            statement = build()
+            build_phase.measure(statement)
+
+        with metrics.phase("translate") as translate_phase:
+            numbered_cnf, num2var = sat_utils.translate(statement)
+            translate_phase.measure(numbered_cnf)
+
+        with metrics.phase("solve") as solve_phase:
+            backend = sat_utils.get_backend(backend)
+            numbered_solutions = list(backend.itersolve(numbered_cnf))
+            solve_phase.solutions = len(numbered_solutions)
+
+        with metrics.phase("decode"):
+            solutions = [
+                [
+                    num2var[n] for n in solution
+                    if n > 0 and not sat_utils.is_aux(num2var[n])
+                ]
+                for solution in numbered_solutions
+            ]
+
+    return solutions, metrics
@@ -0,0 +1,59 @@
+"""Registry of puzzles, each imported only when it is first asked for.
+
+Third-party packages can add puzzles by calling `register`, or without any
+import at all through an entry point in the "sat_examples.puzzles" group:
+
+    [project.entry-points."sat_examples.puzzles"]
+    sudoku = "my_package.sudoku:sudoku"
+"""
+import importlib
+
+
+ENTRY_POINT_GROUP = "sat_examples.puzzles"
+
+_targets = {
+    "simple_lunch": "examples.puzzles.simple_lunch:simple_lunch",
+    "comets": "examples.puzzles.comets:comets",
+    "field_maps": "examples.puzzles.field_maps:solve_maps",
+    "tfinley": "examples.puzzles.tfinley:tfinley",
+    "aerophobes": "examples.puzzles.aerophobes:aerophobes",
+}
+_loaded = dict()
+_scanned_entry_points = False
+
+
+def register(name, target):
+    """Register a puzzle as a callable or a "module:attribute" path."""
+    _loaded.pop(name, None)
+    if callable(target):
+        _loaded[name] = target
+    _targets[name] = target
+
+
+def _scan_entry_points():
+    global _scanned_entry_points
+    if _scanned_entry_points:
+        return
+    _scanned_entry_points = True
+    from importlib import metadata      # Slow to import; only needed here
+    for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        _targets.setdefault(entry_point.name, entry_point.value)
+
+
+def names():
+    """Return the names of every known puzzle."""
+    _scan_entry_points()
+    return sorted(_targets)
+
+
+def get(name):
+    """Return the puzzle callable by name, importing its module if needed."""
+    if name in _loaded:
+        return _loaded[name]
+    if name not in _targets:
+        _scan_entry_points()
+    target = _targets[name]             # KeyError for unknown puzzles
+    module_name, _, attribute = target.partition(":")
+    puzzle = getattr(importlib.import_module(module_name), attribute)
+    _loaded[name] = puzzle
+    return puzzle
@@ -1,8 +1,10 @@
 """Example of a 3x3 logic grid with 5 columns."""
 from contextlib import contextmanager
-import datetime
+import functools
 
+from examples import metrics
 from examples import sat_utils
+from examples.grid import Clue, LogicGrid
 
 
 FLIERS = ("Brandi", "Gwen", "Lee", "Peggy", "Rudy")
@@ -23,16 +25,30 @@ def _flew_with(name, charm):
     return f"{name}'s lucky charm is a {charm}"
 
 
+FORMATTERS = {"state": _flew_to, "charm": _flew_with, "month": _flew_in}
+
+
+@functools.lru_cache(maxsize=None)
+def grid(**categories):
+    """Return the LogicGrid of fliers over the given categories.
+
+    Categories whose values are None are left out.
+    """
+    return LogicGrid(
+        FLIERS,
+        formatters=FORMATTERS,
+        **{c: values for c, values in categories.items() if values is not None},  # noqa
+    )
+
+
 @contextmanager
-def timer(clue):
-    """Print out timing info about the clue runtime."""
-    start_time = datetime.datetime.now()
-    try:
+def timer(clue, statement=None):
+    """Record the clue runtime and clauses as a phase of the active metrics."""
+    with metrics.phase(getattr(clue, "__name__", str(clue)), statement):
         yield clue
-    finally:
-        print(f"{clue} Run time: {datetime.datetime.now() - start_time}")
 
 
+@Clue
 def clue_1(statement):
     """Brandi won't leave in March."""
     statement += [
@@ -42,6 +58,7 @@ def clue_1(statement):
     ]
 
 
+@Clue
 def clue_2(statement):
     """Lee won't bring a shamrock."""
     statement += [
@@ -51,6 +68,7 @@ def clue_2(statement):
     ]
 
 
+@Clue
 def clue_3(statement):
     """The aerophobe going to Wyoming will leave 2 months before Peggy."""
     for index in range(0, len(MONTHS)):
@@ -80,11 +98,13 @@ def clue_3(statement):
             ]
 
 
+@Clue
 def clue_4(statement):
     """Peggy will bring their horseshoe."""
     statement += [(_flew_with("Peggy", "horseshoe"),)]
 
 
+@Clue
 def clue_5(statement):
     """Lee will leave 1 month after Peggy."""
     for index in range(len(MONTHS) - 1, -1, -1):
@@ -106,6 +126,7 @@ def clue_5(statement):
         ]
 
 
+@Clue
 def clue_6(statement):
     """The aerophobe laving in January won't bring a wishbone."""
     for name in FLIERS:
@@ -117,6 +138,7 @@ def clue_6(statement):
         ]
 
 
+@Clue
 def clue_7(statement):
     """The flier with the shamrock will leave sometime after Rudy."""
     for index in range(0, len(MONTHS)):
@@ -141,6 +163,7 @@ def clue_7(statement):
             ]
 
 
+@Clue
 def clue_8(statement):
     """Neither the aerophobe with the wishbone nor the one with the
        lucky hat is leaving in May.
@@ -158,6 +181,7 @@ def clue_8(statement):
         ]
 
 
+@Clue
 def clue_9(statement):
     """Lee is either the flier going to Arkansas or the flier leaving in January."""
     statement += [
@@ -172,6 +196,7 @@ def clue_9(statement):
     ]
 
 
+@Clue
 def clue_10(statement):
     """The flier going to Utah will leave 1 month before Rudy."""
     for index in range(len(MONTHS) - 1, -1, -1):
@@ -201,6 +226,7 @@ def clue_10(statement):
             ]
 
 
+@Clue
 def clue_11(statement):
     """The person going to Hawaii, the one leaving in February, and the one
        with the lucky horseshoe are three different people."""
@@ -225,7 +251,11 @@ def clue_11(statement):
 
 
 def aerophobes(*clues, states=True, charms=True, months=True):
-    """Return a 5x5 logic square of aerophobes travel arrangements."""
+    """Return a 5x5 logic square of aerophobes travel arrangements.
+
+    Each clue is compiled once per grid and cached, so building statements
+    for many subsets of clues only splices the cached fragments together.
+    """
     if not clues:
         clues = (
             clue_1,
@@ -241,37 +271,16 @@ def aerophobes(*clues, states=True, charms=True, months=True):
             clue_11,
         )
 
-    statement = list()
-
-    if states:
-        print("States!")
-        # Each person is flying to one of the destinations
-        for name in FLIERS:
-            statement += sat_utils.one_of(_flew_to(name, state) for state in STATES)  # noqa
-        # Each destination is visited by only one person
-        for state in STATES:
-            statement += sat_utils.one_of(_flew_to(name, state) for name in FLIERS)  # noqa
-
-    if charms:
-        print("Charms!")
-        # Each person flew with one of the charms
-        for name in FLIERS:
-            statement += sat_utils.one_of(_flew_with(name, charm) for charm in CHARMS)  # noqa
-        # Only one of each lucky charm exists
-        for charm in CHARMS:
-            statement += sat_utils.one_of(_flew_with(name, charm) for name in FLIERS)  # noqa
-
-    if months:
-        print("Months!")
-        # Each person flew during one of the months
-        for name in FLIERS:
-            statement += sat_utils.one_of(_flew_in(name, month) for month in MONTHS)  # noqa
-        # Each traveler flew in a different month
-        for month in MONTHS:
-            statement += sat_utils.one_of(_flew_in(name, month) for name in FLIERS)  # noqa
+    categories = {
+        "state": STATES if states else None,
+        "charm": CHARMS if charms else None,
+        "month": MONTHS if months else None,
+    }
+    puzzle = grid(**categories)
+    statement = puzzle.statement()
 
     for clue in clues:
-        with timer(clue) as clue:
-            clue(statement)
+        with timer(clue, statement) as clue:
+            statement.splice(*puzzle.compile(clue))
 
     return statement
@@ -1,7 +1,8 @@
 """Experimentation to the pycosat SAT Solver w/ Hettinger's utils."""
-# import itertools
+import itertools
 
 from examples import sat_utils
+from examples.grid import LogicGrid
 
 
 # Conjunctive Normal Form: A bunch of OR operations connected by AND operations
@@ -9,7 +10,11 @@ from examples import sat_utils
 
 
 class StatementBuilder:
-    """Constructs a CNF statement to solve."""
+    """Constructs a CNF statement to solve.
+
+    `examples.grid.LogicGrid` indexes every group at once and decodes
+    solutions into records; prefer it for whole logic grids.
+    """
 
     def __init__(self, subjects):
         """Init a statement to solve.
@@ -17,7 +22,7 @@ class StatementBuilder:
         Subjects is the possible subjects of categorization (in this case the
         comets).
         """
-        self.statement = list()
+        self.statement = sat_utils.CNFBuffer()
         self.subjects = tuple(subjects)
         self.groups = tuple()
 
@@ -28,21 +33,10 @@ class StatementBuilder:
         be associated with that value.
         """
         self.groups = tuple([group, *self.groups])
-
-        # Each subject must be applied to one value in the group
-        for subject in self.subjects:
-            self.add(
-                sat_utils.one_of(formatter(subject, value) for value in group)
-            )
-
-        # Each value in the group must be applied to a subject
-        for value in group:
-            self.add(
-                sat_utils.one_of(
-                    formatter(subject, value)
-                    for subject in self.subjects
-                )
-            )
+        grid = LogicGrid(
+            self.subjects, formatters={"group": formatter}, group=group,
+        )
+        self.add(grid.constraints())
 
     def add(self, condition):
         """Add a condition to the statement."""
@@ -57,61 +51,65 @@ class StatementBuilder:
 
 def comets():
     """Return a 4x4 logic square of comet discoveries."""
-    # TODO Create a statement builder class
     # TODO Use a set for statement instead of += (to help avoid duplicate clauses?) # noqa
     #      In that same vein is there a way to eliminate other duplicate
     #      overriding logics?
-    # TODO Abstract the ideas of comets/years/astrologers?
-    def _discovered_by(comet, astrologer):
-        return f"{comet} was discovered by {astrologer}"
-
-    def _discovered_in(comet, year):
-        return f"{comet} was discovered in {year}"
-
     comets = ("Casputi", "Crecci", "Peinope", "Sporrin")
     years = ("2008", "2009", "2010", "2011")
     astrologers = ("Hal Gregory", "Jack Ingram", "Ken Jones", "Underwood")
 
-    builder = StatementBuilder(comets)
-    builder.add_group(years, formatter=_discovered_in)
-    builder.add_group(astrologers, formatter=_discovered_by)
+    grid = LogicGrid(
+        comets,
+        formatters={
+            "year": lambda comet, year: f"{comet} was discovered in {year}",
+            "astrologer": lambda comet, astrologer: f"{comet} was discovered by {astrologer}",  # noqa
+        },
+        year=years,
+        astrologer=astrologers,
+    )
+
+    def _discovered_by(comet, astrologer):
+        return grid(comet, "astrologer", astrologer)
+
+    def _discovered_in(comet, year):
+        return grid(comet, "year", year)
+
+    statement = grid.statement()
 
     # Clues
 
     # The one discovered in 2009 is Casputi
     # =========================================================================
-    builder.add([(_discovered_in("Casputi", "2009"),)])
+    statement += [(_discovered_in("Casputi", "2009"),)]
     # =========================================================================
 
     # The one Jack Ingram discovered was found in 2008
     # =========================================================================
-    builder.add(sat_utils.from_dnf([
+    statement += sat_utils.from_dnf([
         (
             _discovered_by(comet, "Jack Ingram"),
             _discovered_in(comet, "2008"),
         )
         for comet in comets
-    ]))
+    ])
     # =========================================================================
 
     # The comet Underwood discovered was discovered 2 years
     # after the comet Jack Ingram Discovered
     # =========================================================================
-    # TODO Why does this clause take so long to run?
-    # dnf = list()
-    # for comet_1, comet_2 in itertools.permutations(comets, 2):
-    #     for index in range(len(comets) - 2):
-    #         dnf += [
-    #             (
-    #                 _discovered_by(comet_1, "Underwood"),
-    #                 _discovered_in(comet_1, years[index + 2]),
-    #                 _discovered_by(comet_2, "Jack Ingram"),
-    #                 _discovered_in(comet_2, years[index])
-    #             ),
-    #         ]
-    # print("Generating 'Discovered 2 years later clause...'")
-    # cnf = sat_utils.from_dnf(dnf)
-    # statement += cnf
+    # Distributing this DNF is exponential; selector variables keep it linear
+    dnf = list()
+    for comet_1, comet_2 in itertools.permutations(comets, 2):
+        for index in range(len(comets) - 2):
+            dnf += [
+                (
+                    _discovered_by(comet_1, "Underwood"),
+                    _discovered_in(comet_1, years[index + 2]),
+                    _discovered_by(comet_2, "Jack Ingram"),
+                    _discovered_in(comet_2, years[index])
+                ),
+            ]
+    statement += sat_utils.from_dnf(dnf, tseitin=True)
     # =========================================================================
 
     # Peinope was discovered 1 year before the one Hal Gregory discovered
@@ -127,14 +125,14 @@ def comets():
                 )
             ]
     cnf = sat_utils.from_dnf(dnf)
-    builder.add(cnf)
+    statement += cnf
     # =========================================================================
 
     # The comet discovered in 2010 is either
     # the one Ken Jones discovered or Crecci
     # =========================================================================
     for comet in comets:
-        builder.add(sat_utils.from_dnf([
+        statement += sat_utils.from_dnf([
             # TODO I'm doing too much human-logic here; the statement proper
             #      must somehow be easier to represent
             (
@@ -151,7 +149,7 @@ def comets():
                 # ...therefor not discovered by Ken Jones
                 sat_utils.neg(_discovered_by("Crecci", "Ken Jones")),
             ),
-        ]))
+        ])
     # =========================================================================
 
-    return builder.build()
+    return statement
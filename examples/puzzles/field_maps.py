@@ -1,8 +1,11 @@
 """Lets see if we can use CNF to perform field maps."""
+from collections import Counter
+import heapq
 import logging
 import sys
 
-import fuzzywuzzy.process
+import fuzzywuzzy.fuzz
+import fuzzywuzzy.utils
 
 from examples import sat_utils
 
@@ -68,40 +71,123 @@ TARGET_FIELDS = [
 
 NULL_FIELD = Field("NOTHING")
 
+PASSING_SCORE = 70
 
-# TODO Need to teach the statement to prefer mapping to NOTHING over mapping to
-#      an unmapped field.
 
+def _process(label):
+    """Normalise a label exactly as `fuzzywuzzy.process.extract` does."""
+    return fuzzywuzzy.utils.full_process(
+        fuzzywuzzy.utils.full_process(label), force_ascii=True,
+    )
 
-def solve_maps(source_fields=SOURCE_FIELDS, target_fields=TARGET_FIELDS):
-    """Attempt to map incoming fields to outgoing fields."""
-    statement = list()
 
-    source_possibilities = {f: {NULL_FIELD} for f in source_fields}
-    target_possibilities = {f: {NULL_FIELD} for f in target_fields}
+class _Processed:
+    """A processed label and the summaries used to bound its fuzzy scores."""
 
-    # TODO Perhaps writing a large DNF of possibilities for a single field for
-    #      all evaluations is the way to go, instead of each of them at the top
+    def __init__(self, label):
+        """Init _Processed for a label."""
+        self.text = _process(label)
+        self.counts = Counter(self.text)
+        self.tokens = set(self.text.split())
+        self.length = len(self.text)
+        # Length once duplicate tokens are dropped, as token_set_ratio does
+        self.set_length = len(" ".join(sorted(self.tokens)))
+
+
+class TargetIndex:
+    """Inverted index over target labels that shortlists fuzzy candidates.
+
+    `extract` returns the same passing matches as
+    `fuzzywuzzy.process.extract(query, labels)` but only exactly scores the
+    labels that could pass. Every score WRatio considers compares strings
+    made of the characters of the two labels, so the number of characters
+    they share bounds it from above; labels sharing a whole token are
+    always scored since token_set_ratio can rate them highly regardless.
+    """
+
+    def __init__(self, labels, cutoff=PASSING_SCORE):
+        """Init TargetIndex over labels."""
+        self.labels = list(labels)
+        self.cutoff = cutoff
+        self.processed = [_Processed(label) for label in self.labels]
+        self.by_char = dict()
+        self.by_token = dict()
+        for i, target in enumerate(self.processed):
+            for char, count in target.counts.items():
+                self.by_char.setdefault(char, []).append((i, count))
+            for token in target.tokens:
+                self.by_token.setdefault(token, []).append(i)
+
+    def _could_pass(self, query, target, shared):
+        """Return whether WRatio(query, target) could exceed the cutoff."""
+        short, long = sorted((query.length, target.length))
+        if not short:
+            return False
+        bound = max(
+            2 * shared / (query.length + target.length),
+            0.95 * 2 * shared / (query.set_length + target.set_length),
+        )
+        if long / short >= 1.5:
+            # partial_ratio windows can be cut short by the end of the string
+            scale = 0.6 if long / short > 8 else 0.9
+            smallest = min(query.set_length, target.set_length)
+            matched = min(shared, smallest)
+            bound = max(bound, scale * 2 * matched / (smallest + matched))
+        return 100 * bound > self.cutoff
+
+    def candidates(self, query):
+        """Return indexes of the labels that might score above the cutoff."""
+        query = _Processed(query)
+        shared = Counter()
+        for char, count in query.counts.items():
+            for i, target_count in self.by_char.get(char, ()):
+                shared[i] += min(count, target_count)
+        shortlist = {
+            i for token in query.tokens for i in self.by_token.get(token, ())
+        }
+        shortlist.update(
+            i for i, overlap in shared.items()
+            if self._could_pass(query, self.processed[i], overlap)
+        )
+        return query, sorted(shortlist)
+
+    def extract(self, query, limit=5):
+        """Return the best (label, score) pairs, like `process.extract`."""
+        query, shortlist = self.candidates(query)
+        scored = [
+            (
+                self.labels[i],
+                fuzzywuzzy.fuzz.WRatio(query.text, self.processed[i].text, full_process=False),  # noqa
+            )
+            for i in shortlist
+        ]
+        return heapq.nlargest(limit, scored, key=lambda pair: pair[1])
+
+
+def _passing_scores(source_fields, target_fields):
+    """Return {(source_field, target_field): score} of passing matches."""
     targets_by_label = {str(field): field for field in target_fields}
+    index = TargetIndex(targets_by_label)
+    passing = dict()
     for source_field in source_fields:
-        # Fuzzy match fields by label name
-        scores = fuzzywuzzy.process.extract(str(source_field), targets_by_label.keys())  # noqa
+        # Fuzzy match fields by label name, scoring only plausible targets
+        scores = index.extract(str(source_field))
         log.debug("Scores for %s: %r", source_field, scores)
-        passing_scores = [score for score in scores if score[1] > 70]
-        if passing_scores:
-            source_possibilities[source_field].update(
-                targets_by_label[label] for label, score in passing_scores
-            )
-            for label, _score in passing_scores:
-                target_field = targets_by_label[label]
-                target_possibilities[target_field].add(source_field)
+        for label, score in scores:
+            if score > PASSING_SCORE:
+                passing[source_field, targets_by_label[label]] = score
+    return passing
 
-            fuzzy_condition = sat_utils.from_dnf([
-                (str(Mapping(source_field, targets_by_label[target_label])),)
-                for target_label, score in scores if score > 70
-            ])
-            log.debug(fuzzy_condition)
-            statement += fuzzy_condition
+
+def _one_to_one(source_fields, target_fields, passing):
+    """Return the statement that each field maps once, maybe to NOTHING."""
+    statement = list()
+
+    source_possibilities = {f: {NULL_FIELD} for f in source_fields}
+    target_possibilities = {f: {NULL_FIELD} for f in target_fields}
+    for source_field, target_field in passing:
+        source_possibilities[source_field].add(target_field)
+        target_possibilities[target_field].add(source_field)
 
     # Determine what source_fields can map to which target_fields
     for target_field in target_fields:
@@ -118,3 +204,49 @@ def solve_maps(source_fields=SOURCE_FIELDS, target_fields=TARGET_FIELDS):
         )
 
     return statement
+
+
+def solve_maps(source_fields=SOURCE_FIELDS, target_fields=TARGET_FIELDS):
+    """Attempt to map incoming fields to outgoing fields."""
+    statement = sat_utils.CNFBuffer()
+    passing = _passing_scores(source_fields, target_fields)
+    passing_targets = dict()
+    for source_field, target_field in passing:
+        passing_targets.setdefault(source_field, []).append(target_field)
+
+    # TODO Perhaps writing a large DNF of possibilities for a single field for
+    #      all evaluations is the way to go, instead of each of them at the top
+    for source_field in source_fields:
+        targets = passing_targets.get(source_field)
+        if targets:
+            fuzzy_condition = sat_utils.from_dnf([
+                (str(Mapping(source_field, target_field)),)
+                for target_field in targets
+            ])
+            log.debug(fuzzy_condition)
+            statement += fuzzy_condition
+
+    statement += _one_to_one(source_fields, target_fields, passing)
+    return statement
+
+
+def best_maps(source_fields=SOURCE_FIELDS, target_fields=TARGET_FIELDS, top=1):  # noqa
+    """Return the top (score, mappings) pairs, highest total score first.
+
+    Instead of insisting every source with a passing match is mapped, each
+    passing mapping becomes a soft clause weighted by its fuzzy score and
+    `sat_utils.maxsat` finds the one-to-one mapping with the best total.
+    A source maps to NOTHING only when that frees its target for a better
+    scoring source.
+    """
+    passing = _passing_scores(source_fields, target_fields)
+    soft = [
+        (score, (str(Mapping(source_field, target_field)),))
+        for (source_field, target_field), score in passing.items()
+    ]
+    hard = _one_to_one(source_fields, target_fields, passing)
+    total = sum(passing.values())
+    return [
+        (total - cost, solution)
+        for cost, solution in sat_utils.maxsat(hard, soft, top=top)
+    ]
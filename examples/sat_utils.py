@@ -3,9 +3,17 @@
 __author__ = 'Raymond Hettinger'
 
 import pycosat                  # https://pypi.python.org/pypi/pycosat
-from itertools import combinations
+from array import array
+from collections import Counter, deque
+from itertools import chain, combinations, count, islice, product
 from functools import lru_cache
+from math import comb, gcd
 from sys import intern
+import os
+
+# Modules only some features need (concurrent.futures, json, mmap,
+# multiprocessing, shlex, subprocess) are imported where they're used,
+# so importing sat_utils stays cheap.
 
 def make_translate(cnf):
     """Make translator from symbolic CNF to PycoSat's numbered clauses.
@@ -30,32 +38,1511 @@ def translate(cnf, uniquify=False):
     'Translate a symbolic cnf to a numbered cnf and return a reverse mapping'
     # DIMACS CNF file format:
     # http://people.sc.fsu.edu/~jburkardt/data/cnf/cnf.html
+    if isinstance(cnf, CNFBuffer):      # Numbered already
+        return cnf.numbered, cnf.num2var
     if uniquify:
         cnf = list(dict.fromkeys(cnf))
     lit2num, num2var = make_translate(cnf)
     numbered_cnf = [tuple([lit2num[lit] for lit in clause]) for clause in cnf]
     return numbered_cnf, num2var
 
-def itersolve(symbolic_cnf, include_neg=False):
-    numbered_cnf, num2var = translate(symbolic_cnf)
-    for solution in pycosat.itersolve(numbered_cnf):
-        yield [num2var[n] for n in solution if include_neg or n > 0]
+############### CNF Buffers ########################################
+
+class CNFBuffer:
+    '''A growing cnf kept DIMACS style, as one array('i') of literals
+       with each clause ended by a 0
+
+       Symbolic literals are numbered as their clauses arrive, in the same
+       order make_translate() would use, so builders can += clauses into
+       it like a list at a few ints per clause.  Iterating still yields
+       symbolic tuples; translate() and the solvers take the numbered
+       view, whose memoryview slices pycosat reads without copying.
+       Integer literals from a VarPool are named by the pool= given, so
+       they can share a buffer with symbolic ones.
+
+        >>> cnf = CNFBuffer()
+        >>> cnf += one_of(['a', 'b'])
+        >>> cnf.literals
+        array('i', [-1, -2, 0, 1, 2, 0])
+        >>> solve_all(cnf)
+        [['b'], ['a']]
+    '''
+    def __init__(self, cnf=(), pool=None):
+        self.literals = array('i')
+        self.lit2num, self.num2var = {}, {}
+        self.pool = pool
+        self.numbered = _NumberedClauses(self)
+        self._num_clauses = 0
+        self.extend(cnf)
+    def append(self, clause) -> None:
+        '''Number and add one clause, declaring its new variables only
+           once the literals are stored'''
+        lit2num, num2var = self.lit2num, self.num2var
+        numbered, fresh = [], {}
+        for literal in clause:
+            if isinstance(literal, int):
+                literal = self._name(literal)
+            num = lit2num.get(literal)
+            if num is None:
+                negated = literal[0] == '~'
+                var = literal[1:] if negated else literal
+                num = fresh.get(var)
+                if num is None:
+                    num = fresh[var] = len(num2var) // 2 + len(fresh) + 1
+                num = -num if negated else num
+            numbered.append(num)
+        numbered.append(0)
+        # Raises BufferError while numbered views are held, before any
+        # variable is declared, so the buffer stays consistent
+        self.literals.extend(numbered)
+        for var, num in fresh.items():
+            var = intern(var)
+            num2var[num], num2var[-num] = var, intern('~' + var)
+            lit2num[var], lit2num[num2var[-num]] = num, -num
+        self._num_clauses += 1
+    def _name(self, literal: int) -> str:
+        if self.pool is None:
+            raise ValueError(f'Integer literal {literal} needs a pool= '
+                             'to name it')
+        return self.pool.num2var[literal]
+    def extend(self, cnf) -> None:
+        'Number and add clauses'
+        for clause in cnf:
+            self.append(clause)
+    def declare(self, variables) -> None:
+        'Number variables in the given order, ahead of their clauses'
+        lit2num, num2var = self.lit2num, self.num2var
+        for var in variables:
+            if var not in lit2num:
+                var = intern(var)
+                num = len(num2var) // 2 + 1
+                num2var[num], num2var[-num] = var, intern('~' + var)
+                lit2num[var], lit2num[num2var[-num]] = num, -num
+    def copy(self) -> 'CNFBuffer':
+        'A buffer with the same clauses and numbering, to grow separately'
+        other = CNFBuffer(pool=self.pool)
+        other.literals = array('i', self.literals)
+        other.lit2num, other.num2var = dict(self.lit2num), dict(self.num2var)
+        other._num_clauses = self._num_clauses
+        return other
+    def splice(self, literals, variables) -> None:
+        '''Append zero-terminated numbered clauses in which num n stands
+           for variables[n - 1], renumbering only if this buffer differs'''
+        lit2num = self.lit2num
+        fresh = [var for var in dict.fromkeys(variables) if var not in lit2num]
+        fresh = dict(zip(fresh, count(len(self.num2var) // 2 + 1)))
+        renumber = [0, *[lit2num.get(var) or fresh[var] for var in variables]]
+        if renumber == list(range(len(renumber))):
+            self.literals.extend(literals)
+        else:
+            self.literals.extend([renumber[n] if n >= 0 else -renumber[-n]
+                                  for n in literals])
+        self.declare(fresh)             # Numbers them as renumber did
+        self._num_clauses += literals.count(0)
+    def __iadd__(self, cnf) -> 'CNFBuffer':
+        self.extend(cnf)
+        return self
+    def truncate(self, num_literals, num_clauses, num_vars) -> None:
+        'Drop literals, clauses and variables past the given counts'
+        del self.literals[num_literals:]
+        self._num_clauses = num_clauses
+        for num in range(num_vars + 1, len(self.num2var) // 2 + 1):
+            for n in (num, -num):
+                del self.lit2num[self.num2var.pop(n)]
+    def __len__(self) -> int:
+        return self._num_clauses
+    def __iter__(self):
+        num2var = self.num2var
+        for clause in self.numbered:
+            yield tuple([num2var[n] for n in clause])
+    def __repr__(self) -> str:
+        return (f'{self.__class__.__name__}(clauses={len(self)}, '
+                f'vars={len(self.num2var) // 2})')
+
+class _NumberedClauses:
+    'Numbered view of a CNFBuffer, as memoryview slices between the zeros'
+    def __init__(self, buffer):
+        self.buffer = buffer
+    def __len__(self) -> int:
+        return len(self.buffer)
+    def __eq__(self, other) -> bool:
+        'Equal to any numbered cnf with the same clauses, like a list'
+        try:
+            return len(self) == len(other) and all(
+                tuple(a) == tuple(b) for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+    def __iter__(self):
+        literals = self.buffer.literals
+        view, start = memoryview(literals), 0
+        try:
+            for _ in range(len(self.buffer)):
+                end = literals.index(0, start)
+                yield view[start:end]
+                start = end + 1
+        finally:
+            view.release()
+
+############### DIMACS Files #######################################
+
+SYMBOLS_SUFFIX = '.symbols.json'
+_HEADER = 'p cnf {:<20} {:<20}\n'      # Fixed width so it can be rewritten
+
+def write_dimacs(cnf, path, symbols=True) -> 'num2var':
+    '''Stream a symbolic or numbered cnf to a DIMACS file
+
+       Symbols are numbered as they are first seen, like make_translate().
+       With symbols=True the num2var table is saved to a sidecar next to
+       the file, as a JSON list of variable names in numbered order.
+    '''
+    path = os.fspath(path)
+    lit2num, names = {}, []
+    num_vars = num_clauses = 0
+    with open(path, 'w') as f:
+        f.write(_HEADER.format(0, 0))
+        for clause in cnf:
+            numbered = []
+            for literal in clause:
+                if isinstance(literal, int):
+                    num = literal
+                else:
+                    num = lit2num.get(literal)
+                    if num is None:
+                        var = literal[1:] if literal[0] == '~' else literal
+                        names.append(var)
+                        lit2num[var], lit2num['~' + var] = (len(names),
+                                                            -len(names))
+                        num = lit2num[literal]
+                num_vars = max(num_vars, abs(num))
+                numbered.append(str(num))
+            numbered.append('0\n')
+            f.write(' '.join(numbered))
+            num_clauses += 1
+        f.seek(0)
+        f.write(_HEADER.format(num_vars, num_clauses))
+    if symbols and names:
+        import json
+        with open(path + SYMBOLS_SUFFIX, 'w') as f:
+            json.dump(names, f)
+    num2var = {}
+    for num, var in enumerate(names, start=1):
+        num2var[num], num2var[-num] = var, '~' + var
+    return num2var
+
+def iter_dimacs(path) -> 'numbered clauses':
+    'Stream numbered clauses out of a memory-mapped DIMACS file'
+    import mmap
+    path = os.fspath(path)
+    if not os.path.getsize(path):
+        return
+    with open(path, 'rb') as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        clause = []
+        for line in iter(mm.readline, b''):
+            if line.lstrip()[:1] in (b'c', b'p', b'%'):
+                continue
+            for num in map(int, line.split()):
+                if num:
+                    clause.append(num)
+                else:
+                    yield tuple(clause)
+                    clause = []
+        if clause:
+            yield tuple(clause)
+
+def read_dimacs(path) -> ('numbered_cnf', 'num2var'):
+    '''Read a DIMACS file back into numbered clauses and a reverse mapping
+
+       Names come from the symbols sidecar when there is one; otherwise
+       each variable is named by its DIMACS number.
+    '''
+    import json
+    path = os.fspath(path)
+    numbered_cnf = list(iter_dimacs(path))
+    try:
+        with open(path + SYMBOLS_SUFFIX) as f:
+            names = json.load(f)
+    except FileNotFoundError:
+        top = max((abs(n) for clause in numbered_cnf for n in clause),
+                  default=0)
+        names = [str(num) for num in range(1, top + 1)]
+    num2var = {}
+    for num, var in enumerate(names, start=1):
+        var = intern(var)
+        num2var[num], num2var[-num] = var, intern('~' + var)
+    return numbered_cnf, num2var
+
+############### Backends ###########################################
+
+# A backend solves numbered cnfs.  Anything with these three methods will do:
+#   solve(numbered_cnf)     -> a full numbered model, or None if UNSAT
+#   itersolve(numbered_cnf) -> every full numbered model
+#   count(numbered_cnf)     -> the number of models
+
+class PycosatBackend:
+    'Solve in-process with pycosat'
+    def solve(self, numbered_cnf) -> 'numbered solution or None':
+        solution = pycosat.solve(numbered_cnf)
+        return None if isinstance(solution, str) else solution
+    def itersolve(self, numbered_cnf) -> 'numbered solutions':
+        return pycosat.itersolve(numbered_cnf)
+    def count(self, numbered_cnf) -> int:
+        return sum(1 for _ in self.itersolve(numbered_cnf))
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}()'
+
+class DimacsBackend:
+    '''Solve with a local solver binary that reads DIMACS on stdin
+
+       The cnf is written down a pipe and the SAT competition output
+       format is parsed back:  an "s SATISFIABLE" status line followed by
+       "v" lines of literals.  Enumeration re-runs the binary, blocking
+       each model found so far.
+
+        >>> backend = DimacsBackend('kissat -q')
+        >>> solve_all(one_of(['a', 'b']), backend=backend)  # doctest: +SKIP
+        [['a'], ['b']]
+    '''
+    def __init__(self, command):
+        if isinstance(command, str):
+            import shlex
+            command = shlex.split(command)
+        self.command = list(command)
+    def solve(self, numbered_cnf) -> 'numbered solution or None':
+        clauses = numbered_cnf if isinstance(numbered_cnf, list) \
+                  else list(numbered_cnf)
+        num_vars = max((abs(n) for clause in clauses for n in clause),
+                       default=0)
+        dimacs = [f'p cnf {num_vars} {len(clauses)}\n']
+        dimacs += [' '.join(map(str, clause)) + ' 0\n' for clause in clauses]
+        import subprocess
+        # communicate() feeds stdin while draining stdout, so a solver that
+        # talks before it has read everything can't fill the pipe and stall
+        with subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, text=True) as process:
+            output, _ = process.communicate(''.join(dimacs))
+        status, values = None, []
+        for line in output.splitlines():
+            if line.startswith('s '):
+                status = line[2:].strip()
+            elif line.startswith('v '):
+                values.extend(map(int, line[2:].split()))
+        if status == 'UNSATISFIABLE':
+            return None
+        if status != 'SATISFIABLE':
+            raise RuntimeError(f'{self.command[0]} exited with status '
+                               f'{process.returncode} and no result')
+        solution = [-num for num in range(1, num_vars + 1)]
+        for n in values:
+            if 0 < abs(n) <= num_vars:
+                solution[abs(n) - 1] = n
+        return solution
+    def itersolve(self, numbered_cnf) -> 'numbered solutions':
+        # Copies, so a CNFBuffer's views aren't held while enumerating
+        clauses = [tuple(clause) for clause in numbered_cnf]
+        while (solution := self.solve(clauses)) is not None:
+            yield solution
+            clauses.append(tuple(-n for n in solution))
+    def count(self, numbered_cnf) -> int:
+        return sum(1 for _ in self.itersolve(numbered_cnf))
+    def __repr__(self) -> str:
+        import shlex
+        return f'{self.__class__.__name__}({shlex.join(self.command)!r})'
+
+BACKENDS = {'pycosat': PycosatBackend()}
+DEFAULT_BACKEND = 'pycosat'
+
+def get_backend(backend=None) -> 'backend':
+    'Look up a backend by name; None is the default and objects pass through'
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    if not isinstance(backend, str):
+        return backend
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f'Unknown backend {backend!r}, '
+                         f'choose from {sorted(BACKENDS)}') from None
+
+############### Solving ############################################
+
+def iter_projected(numbered_cnf, project, backend=None,
+                   units=()) -> 'numbered models':
+    'Distinct assignments to the numbered variables in project'
+    backend = get_backend(backend)
+    project = sorted({abs(num) for num in project})
+    units = [(lit,) for lit in units]
+    blocked = []
+    while True:
+        solution = backend.solve(chain(numbered_cnf, units, blocked))
+        if solution is None:
+            return
+        assignment = [solution[num - 1] for num in project]
+        yield assignment
+        # Block only this projection, not the full model
+        blocked.append(tuple(-n for n in assignment))
+
+############### Clause Buffers #####################################
+
+class ClauseBuffer:
+    '''Numbered clauses packed flat: int32 literals plus int64 offsets
+
+       Clause i is literals[offsets[i]:offsets[i + 1]].  Iterating yields
+       memoryview slices, which pycosat reads like tuples, so a buffer can
+       be solved without rebuilding a Python object per literal.  share()
+       publishes it in shared memory for worker processes to attach().
+
+        >>> buffer = ClauseBuffer.from_clauses([(1, -2), (2,)])
+        >>> len(buffer), buffer[0], pycosat.solve(buffer)
+        (2, (1, -2), [1, 2])
+    '''
+    def __init__(self, literals, offsets, shm=None):
+        self.literals, self.offsets, self._shm = literals, offsets, shm
+    @classmethod
+    def from_clauses(cls, numbered_cnf) -> 'ClauseBuffer':
+        literals, offsets = array('i'), array('q', [0])
+        for clause in numbered_cnf:
+            literals.extend(clause)
+            offsets.append(len(literals))
+        return cls(literals, offsets)
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    def __getitem__(self, i) -> 'clause':
+        return tuple(self.literals[self.offsets[i]:self.offsets[i + 1]])
+    def __iter__(self):
+        literals, offsets = memoryview(self.literals), self.offsets
+        for i in range(len(offsets) - 1):
+            yield literals[offsets[i]:offsets[i + 1]]
+    def share(self) -> 'SharedClauses':
+        'Copy into a new shared memory block; use as a context manager'
+        return SharedClauses(self)
+    @classmethod
+    def attach(cls, handle) -> 'ClauseBuffer':
+        'View a buffer published by share() in another process, uncopied'
+        name, num_literals, num_clauses = handle
+        shm = _shared_memory(name)
+        split = 8 * (num_clauses + 1)   # Offsets first, so both align
+        offsets = shm.buf[:split].cast('q')
+        literals = shm.buf[split:split + 4 * num_literals].cast('i')
+        return cls(literals, offsets, shm)
+    def close(self) -> None:
+        'Detach from shared memory, if attached'
+        if self._shm is not None:
+            self.literals.release()
+            self.offsets.release()
+            self._shm.close()
+            self._shm = None
+    def __repr__(self) -> str:
+        return (f'{self.__class__.__name__}(clauses={len(self)}, '
+                f'literals={len(self.literals)})')
+
+def _shared_memory(name=None, size=0) -> 'SharedMemory':
+    'Shared memory left alone by the resource tracker; SharedClauses unlinks'
+    from multiprocessing import resource_tracker, shared_memory
+    try:
+        return shared_memory.SharedMemory(name, name is None, size,
+                                          track=False)
+    except TypeError:                   # Before Python 3.13
+        shm = shared_memory.SharedMemory(name, name is None, size)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+class SharedClauses:
+    '''A ClauseBuffer copied into shared memory, unlinked on exit
+
+       handle is a small picklable tuple for ClauseBuffer.attach().
+    '''
+    def __init__(self, buffer):
+        literals = memoryview(buffer.literals).cast('B')
+        offsets = memoryview(buffer.offsets).cast('B')
+        size = len(offsets) + len(literals)
+        self.shm = _shared_memory(size=size)
+        self.shm.buf[:len(offsets)] = offsets
+        self.shm.buf[len(offsets):size] = literals
+        self.handle = (self.shm.name, len(buffer.literals), len(buffer))
+    def __enter__(self) -> 'SharedClauses':
+        return self
+    def __exit__(self, *exc_info) -> None:
+        from multiprocessing import resource_tracker
+        self.shm.close()
+        if not hasattr(self.shm, '_track'):     # unlink() will unregister
+            resource_tracker.register(self.shm._name, 'shared_memory')
+        self.shm.unlink()
+
+############### Cube and Conquer ###################################
+
+_worker_cnf = _worker_backend = _worker_queue = None
+
+def _init_worker(handle, backend=None, queue=None):
+    global _worker_cnf, _worker_backend, _worker_queue
+    _worker_cnf, _worker_backend = ClauseBuffer.attach(handle), \
+                                   get_backend(backend)
+    _worker_queue = queue
+
+def _solve_cube(cube, project_nums, batch):
+    'Stream a cube\'s models back in lists of up to batch, then a None'
+    if project_nums is None:
+        clauses = chain(_worker_cnf, [(lit,) for lit in cube])
+        models = iter(_worker_backend.itersolve(clauses))
+    else:
+        models = iter_projected(_worker_cnf, project_nums, _worker_backend,
+                                units=cube)
+    while chunk := list(islice(models, batch)):
+        _worker_queue.put(chunk)
+    _worker_queue.put(None)
+
+def split_vars(numbered_cnf, depth, candidates=None) -> 'nums':
+    'The depth most frequently occurring variables, to split the search on'
+    occurrences = Counter(abs(n) for clause in numbered_cnf for n in clause)
+    if candidates is not None:
+        candidates = {abs(n) for n in candidates}
+        occurrences = Counter({num: occurrences[num] for num in candidates})
+    return [num for num, _ in occurrences.most_common(depth)]
+
+def iter_parallel(numbered_cnf, workers, project_nums=None, backend=None,
+                  batch=256):
+    '''Numbered solutions enumerated by a pool of worker processes
+
+       Fixing every sign combination of a few split variables partitions
+       the models into disjoint cubes; each worker enumerates one cube at
+       a time and streams its models back batch at a time through a
+       bounded queue, so workers pause while the consumer falls behind.
+       With a projection only projected variables are split on, so no
+       answer repeats.  Closing the generator early kills the workers.
+    '''
+    import multiprocessing
+    depth = max(1, (4 * workers - 1).bit_length())
+    split = split_vars(numbered_cnf, depth, project_nums)
+    cubes = [tuple(sign * num for sign, num in zip(signs, split))
+             for signs in product((1, -1), repeat=len(split))]
+    if not isinstance(numbered_cnf, ClauseBuffer):
+        numbered_cnf = ClauseBuffer.from_clauses(numbered_cnf)
+    queue = multiprocessing.Queue(2 * workers)
+    # Workers attach to one shared copy of the clauses instead of unpickling
+    with numbered_cnf.share() as shared:
+        pool = multiprocessing.Pool(workers, _init_worker,
+                                    (shared.handle, backend, queue))
+        try:
+            for cube in cubes:
+                pool.apply_async(_solve_cube, (cube, project_nums, batch),
+                                 error_callback=queue.put)
+            unfinished = len(cubes)
+            while unfinished:
+                chunk = queue.get()
+                if chunk is None:
+                    unfinished -= 1
+                elif isinstance(chunk, BaseException):
+                    raise chunk
+                else:
+                    yield from chunk
+        finally:
+            pool.terminate()            # Also stops cubes still running
+            pool.join()
+
+def _numbered(numbered_cnf, project_nums=None, workers=None, backend=None):
+    if workers is not None and workers > 1:
+        return iter_parallel(numbered_cnf, workers, project_nums, backend)
+    if project_nums is None:
+        return get_backend(backend).itersolve(numbered_cnf)
+    return iter_projected(numbered_cnf, project_nums, backend)
+
+def _decode(numbered_cnf, num2var, include_neg, project_nums=None,
+            workers=None, backend=None):
+    for solution in _numbered(numbered_cnf, project_nums, workers, backend):
+        yield [num2var[n] for n in solution
+               if (include_neg or n > 0) and not is_aux(num2var[n])]
+
+def _project_nums(project, lit2num) -> 'nums':
+    try:
+        return [lit2num[literal] for literal in project]
+    except KeyError as e:
+        raise ValueError(f'{e.args[0]!r} does not appear in the cnf') from None
+
+def _translate_pool(cnf, pool) -> ('numbered_cnf', 'num2var', 'lit2num'):
+    '''Renumber a cnf of VarPool literals densely, in pool order
+
+       Pool variables the cnf doesn't mention, such as other statements'
+       keys or auxiliaries of discarded constraints, would otherwise be
+       free variables that multiply the solutions.  lit2num maps the pool
+       literals to their numbers here.
+    '''
+    cnf = cnf if isinstance(cnf, list) else list(cnf)
+    used = sorted({abs(n) for clause in cnf for n in clause})
+    lit2num = {}
+    for num, old in enumerate(used, 1):
+        lit2num[old], lit2num[-old] = num, -num
+    num2var = {lit2num[n]: pool.num2var[n] for n in lit2num}
+    if used and used[-1] != len(used):
+        cnf = [tuple([lit2num[n] for n in clause]) for clause in cnf]
+    return cnf, num2var, lit2num
+
+def _prepare(symbolic_cnf, pool, project) -> ('numbered_cnf', 'num2var',
+                                               'project_nums'):
+    if pool is not None and not isinstance(symbolic_cnf, CNFBuffer):
+        numbered_cnf, num2var, lit2num = _translate_pool(symbolic_cnf, pool)
+    else:
+        numbered_cnf, num2var = translate(symbolic_cnf)
+        lit2num = None
+    if project is not None:
+        if lit2num is None:
+            lit2num = {var: num for num, var in num2var.items()}
+        project = _project_nums(project, lit2num)
+    return numbered_cnf, num2var, project
+
+def itersolve(symbolic_cnf, include_neg=False, pool=None, project=None,
+              workers=None, backend=None):
+    '''Iterate over solutions of a symbolic cnf
+
+       With project=[variables], yield each distinct assignment to just
+       those variables once, however many models extend it.  With
+       workers=N > 1 the search is split across N processes; the same
+       solutions are yielded, in no particular order.  The backend is a
+       name from BACKENDS or an object such as DimacsBackend('kissat').
+    '''
+    numbered_cnf, num2var, project = _prepare(symbolic_cnf, pool, project)
+    return _decode(numbered_cnf, num2var, include_neg, project, workers,
+                   backend)
+
+def solve_all(symcnf, include_neg=False, pool=None, project=None,
+              workers=None, backend=None, as_array=False, packed=False,
+              spill=None):
+    if as_array:
+        return solve_array(symcnf, pool, project, workers, backend, packed,
+                           spill)
+    return list(itersolve(symcnf, include_neg, pool, project, workers,
+                          backend))
+
+def solve_one(symcnf, include_neg=False, pool=None, project=None,
+              backend=None):
+    return next(itersolve(symcnf, include_neg, pool, project,
+                          backend=backend))
+
+############### Batches ############################################
+
+_worker_tables = []                     # (lit2num, num2var), newest last
+TABLES_PER_WORKER = 8
+
+def _translate_reusing(cnf, tables) -> ('numbered_cnf', 'num2var'):
+    '''translate(), reusing a table from tables when the vocabulary matches
+
+       Problems with exactly the same variables skip building and
+       interning a fresh symbol table.  A table that covers more variables
+       can't be reused: the extras would be free and multiply solutions.
+    '''
+    if isinstance(cnf, CNFBuffer):
+        return translate(cnf)
+    for i in range(len(tables) - 1, -1, -1):
+        lit2num, num2var = tables[i]
+        try:
+            numbered_cnf = [tuple([lit2num[lit] for lit in clause])
+                            for clause in cnf]
+        except KeyError:
+            continue
+        used = {abs(n) for clause in numbered_cnf for n in clause}
+        if len(used) == len(num2var) // 2:
+            tables.append(tables.pop(i))
+            return numbered_cnf, num2var
+    lit2num, num2var = make_translate(cnf)
+    tables.append((lit2num, num2var))
+    del tables[:-TABLES_PER_WORKER]
+    numbered_cnf = [tuple([lit2num[lit] for lit in clause]) for clause in cnf]
+    return numbered_cnf, num2var
+
+def _solve_chunk(chunk, include_neg, backend) -> '[(index, solutions)]':
+    results = []
+    for index, cnf in chunk:
+        numbered_cnf, num2var = _translate_reusing(cnf, _worker_tables)
+        results.append((index, list(_decode(numbered_cnf, num2var,
+                                            include_neg, backend=backend))))
+    return results
+
+def solve_batch(cnfs, workers=None, include_neg=False, ordered=True,
+                chunksize=None, backend=None) -> 'solve_all() results':
+    '''solve_all() many independent symbolic cnfs over a process pool
+
+       Problems go to the workers in chunks of chunksize (by default about
+       four chunks per worker).  Results are yielded in input order, or
+       with ordered=False as (index, solutions) pairs as chunks finish.
+       Each worker keeps its recent symbol tables, so problems sharing a
+       vocabulary aren't re-translated from scratch.
+
+        >>> list(solve_batch([one_of(['a', 'b']), [('a',), ('~a',)]]))
+        [[['b'], ['a']], []]
+    '''
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    cnfs = list(enumerate(cnfs))
+    workers = workers or os.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(cnfs) // (4 * workers))
+    chunks = [cnfs[i:i + chunksize] for i in range(0, len(cnfs), chunksize)]
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_solve_chunk, chunk, include_neg, backend)
+                   for chunk in chunks]
+        if not ordered:
+            futures = as_completed(futures)
+        for future in futures:
+            for index, solutions in future.result():
+                yield solutions if ordered else (index, solutions)
+
+############### Solution Arrays ####################################
+
+def solve_array(symcnf, pool=None, project=None, workers=None, backend=None,
+                packed=False, spill=None, chunk_rows=4096) -> ('matrix',
+                                                               'columns'):
+    '''All solutions as a NumPy matrix of solutions x variables
+
+       Returns the matrix and its columns, the variable names in num2var
+       order (or the project order) with auxiliaries left out.  Entries are
+       bools, or with packed=True rows of numpy.packbits() bytes.  With
+       spill=path, rows are streamed to that file in chunks and returned
+       as a read-only numpy.memmap, so answer sets larger than RAM fit.
+
+        >>> matrix, columns = solve_array(Q(['a', 'b', 'c']) <= 1)
+        >>> columns, matrix.sum(axis=0)    # How often each one is true
+        (['a', 'b', 'c'], array([1, 1, 1]))
+    '''
+    import numpy as np                  # Optional dependency
+
+    numbered_cnf, num2var, project = _prepare(symcnf, pool, project)
+    if project is None:
+        top = max((abs(n) for clause in numbered_cnf for n in clause),
+                  default=0)
+        nums = [num for num in range(1, top + 1) if not is_aux(num2var[num])]
+        positions = [num - 1 for num in nums]
+    else:
+        nums = [abs(num) for num in project]
+        order = sorted(set(nums))       # Projected models come sorted
+        positions = [order.index(num) for num in nums]
+    columns = [num2var[num] for num in nums]
+    width = (len(columns) + 7) // 8 if packed else len(columns)
+    dtype = np.uint8 if packed else np.bool_
+
+    def chunks():
+        solutions = _numbered(numbered_cnf, project, workers, backend)
+        while True:
+            rows = list(islice(solutions, chunk_rows))
+            if not rows:
+                return
+            matrix = np.array(rows, dtype=np.int32)[:, positions] > 0
+            yield np.packbits(matrix, axis=1) if packed else matrix
+
+    if spill is None:
+        blocks = list(chunks())
+        if not blocks:
+            return np.zeros((0, width), dtype), columns
+        return np.concatenate(blocks), columns
+    num_rows = 0
+    with open(spill, 'wb') as f:
+        for block in chunks():
+            f.write(np.ascontiguousarray(block, dtype).tobytes())
+            num_rows += len(block)
+    if not num_rows or not width:
+        return np.zeros((num_rows, width), dtype), columns
+    return np.memmap(spill, dtype, mode='r', shape=(num_rows, width)), columns
+
+############### Model Counting #####################################
+
+def _propagate(clauses, units) -> '(clauses, assigned) or None':
+    'Assign units and everything they force; None on a conflict'
+    assigned = set()
+    while units:
+        if any(-lit in units for lit in units):
+            return None
+        assigned |= units
+        falsified = {-lit for lit in units}
+        reduced, units = [], set()
+        for clause in clauses:
+            if not clause.isdisjoint(assigned):
+                continue
+            if not clause.isdisjoint(falsified):
+                clause = clause - falsified
+                if not clause:
+                    return None
+                if len(clause) == 1:
+                    units |= clause
+            reduced.append(clause)
+        clauses = reduced
+    return clauses, assigned
+
+def _components(clauses) -> 'clause lists':
+    'Partition clauses into groups that share no variables'
+    occurs = {}
+    for cid, clause in enumerate(clauses):
+        for lit in clause:
+            occurs.setdefault(abs(lit), []).append(cid)
+    seen = set()
+    for cid in range(len(clauses)):
+        if cid in seen:
+            continue
+        seen.add(cid)
+        component, stack = [], [cid]
+        while stack:
+            clause = clauses[stack.pop()]
+            component.append(clause)
+            for lit in clause:
+                for other in occurs.pop(abs(lit), ()):
+                    if other not in seen:
+                        seen.add(other)
+                        stack.append(other)
+        yield component
+
+def _run(frame) -> 'result':
+    '''Run a generator frame that yields subframes for their results
+
+       Each frame is suspended on a list rather than the Python stack, so
+       a long chain of implications can't raise RecursionError.
+    '''
+    stack, result = [frame], None
+    while stack:
+        try:
+            stack.append(stack[-1].send(result))
+            result = None
+        except StopIteration as done:
+            stack.pop()
+            result = done.value
+    return result
+
+def _count(clauses, num_vars, cap, cache) -> 'frame':
+    'Models over num_vars variables, of which clauses mention some'
+    mentioned = {abs(lit) for clause in clauses for lit in clause}
+    total = 1
+    for component in _components(clauses):
+        key = frozenset(component)
+        count = cache.get(key)
+        if count is None:
+            count = yield _count_component(component, cap, cache)
+            if count < cap:             # Capped counts aren't exact
+                cache[key] = count
+        total *= min(count, cap)
+        if not total:
+            return 0
+    return min(total << (num_vars - len(mentioned)), cap)
+
+def _count_component(clauses, cap, cache) -> 'frame':
+    'Branch on the busiest variable of a connected component'
+    occurrences = Counter(abs(lit) for clause in clauses for lit in clause)
+    var = occurrences.most_common(1)[0][0]
+    num_vars = len(occurrences)
+    total = 0
+    for lit in (var, -var):
+        propagated = _propagate(clauses, {lit})
+        if propagated is not None:
+            reduced, assigned = propagated
+            total += yield _count(reduced, num_vars - len(assigned),
+                                  cap - total, cache)
+            if total >= cap:
+                return cap
+    return total
+
+def count_solutions(cnf, cap=None, pool=None) -> int:
+    '''Count the solutions of a cnf without enumerating them
+
+       A DPLL search with unit propagation that splits the clauses into
+       independent components, multiplies their counts and caches each
+       component's count.  With cap=N counting stops once N solutions are
+       known to exist, so cap=2 checks that a puzzle has a unique answer.
+
+        >>> count_solutions(Q(['a', 'b', 'c', 'd']) == 2)
+        6
+        >>> count_solutions(some_of(['a', 'b', 'c', 'd']), cap=2)
+        2
+    '''
+    cnf = _prepare(cnf, pool, None)[0]
+    clauses = [frozenset(clause) for clause in cnf]
+    num_vars = max((abs(lit) for clause in clauses for lit in clause),
+                   default=0)
+    cap = float('inf') if cap is None else cap
+    if cap <= 0 or frozenset() in clauses:
+        return 0
+    propagated = _propagate(clauses, {next(iter(clause)) for clause in clauses
+                                      if len(clause) == 1})
+    if propagated is None:
+        return 0
+    reduced, assigned = propagated
+    return _run(_count(reduced, num_vars - len(assigned), cap, {}))
+
+############### Incremental Solving ################################
 
-def solve_all(symcnf, include_neg=False):
-    return list(itersolve(symcnf, include_neg))
+class Solver:
+    '''Incremental session over a growing symbolic cnf
 
-def solve_one(symcnf, include_neg=False):
-    return next(itersolve(symcnf, include_neg))
+       Literals are numbered once, as their clauses arrive through add(),
+       so a what-if query against a shared base only translates the delta.
+       push() records a checkpoint and pop() rolls the clauses and any
+       literals introduced since then back to it.  Clauses of VarPool
+       literals need the pool= that made them.
+
+        >>> solver = Solver(one_of(['a', 'b']))
+        >>> solver.push()
+        >>> solver.add([('~a',)]).solve_all()
+        [['b']]
+        >>> solver.pop()
+        >>> len(solver.solve_all())
+        2
+    '''
+    def __init__(self, cnf=(), backend=None, pool=None):
+        self.buffer = CNFBuffer(pool=pool)
+        self.lit2num, self.num2var = self.buffer.lit2num, self.buffer.num2var
+        self.backend = get_backend(backend)
+        self._checkpoints = []
+        self.add(cnf)
+    def add(self, cnf) -> 'Solver':
+        'Translate and append clauses'
+        self.buffer += cnf
+        return self
+    def push(self) -> None:
+        'Checkpoint the current clauses for a later pop()'
+        self._checkpoints.append((len(self.buffer.literals), len(self.buffer),
+                                  len(self.num2var) // 2))
+    def pop(self) -> None:
+        'Discard everything added since the matching push()'
+        self.buffer.truncate(*self._checkpoints.pop())
+    def itersolve(self, include_neg=False, project=None):
+        if project is not None:
+            project = [self.buffer._name(lit) if isinstance(lit, int) else lit
+                       for lit in project]
+            project = _project_nums(project, self.lit2num)
+        return _decode(self.buffer.numbered, self.num2var, include_neg,
+                       project, backend=self.backend)
+    def solve_all(self, include_neg=False, project=None):
+        return list(self.itersolve(include_neg, project))
+    def solve_one(self, include_neg=False, project=None):
+        return next(self.itersolve(include_neg, project))
+    def __len__(self) -> int:
+        return len(self.buffer)
+    def __repr__(self) -> str:
+        return (f'{self.__class__.__name__}(clauses={len(self.buffer)}, '
+                f'vars={len(self.num2var) // 2})')
+
+############### Backbones ##########################################
+
+def backbone(cnf, pool=None, chunk=16, backend=None) -> 'literals':
+    '''Literals true in every solution of a cnf, or None if it has none
+
+       Starts from one model's literals and tests chunk of them at a time
+       with a clause asking for any of them to flip.  UNSAT proves the
+       whole chunk; a model drops every candidate it flips.  Each call
+       settles at least one variable, so the cost follows the number of
+       variables rather than the number of solutions.
+
+        >>> backbone(one_of(['a', 'b', 'c']) + [('~a',), ('~b', 'c')])
+        ['~a', '~b', 'c']
+    '''
+    backend = get_backend(backend)
+    numbered_cnf, num2var, _ = _prepare(cnf, pool, None)
+    model = backend.solve(numbered_cnf)
+    if model is None:
+        return None
+    candidates = [num for num in model if not is_aux(num2var[num])]
+    forced = []
+    while candidates:
+        check = candidates[:chunk]
+        model = backend.solve(chain(numbered_cnf, [(num,) for num in forced],
+                                    [[-num for num in check]]))
+        if model is None:
+            forced += check
+            candidates = candidates[chunk:]
+        else:
+            model = set(model)
+            candidates = [num for num in candidates if num in model]
+    return [num2var[num] for num in sorted(forced, key=abs)]
+
+############### Preprocessing ######################################
+
+def _var(literal) -> 'variable':
+    if isinstance(literal, int):
+        return abs(literal)
+    return literal[1:] if literal.startswith('~') else literal
+
+class Simplified:
+    '''A simplified cnf and the assignments needed to rebuild full models
+
+       units are literals forced by unit propagation, pure are literals
+       set by pure literal elimination, and free are variables that no
+       longer appear because every clause mentioning them was satisfied.
+    '''
+    def __init__(self, cnf, units, pure, free):
+        self.cnf, self.units, self.pure, self.free = cnf, units, pure, free
+    def extend(self, solution, include_neg=False) -> 'solution':
+        'Complete a solution of the simplified cnf; free variables are false'
+        fixed = self.units + self.pure
+        if not include_neg:
+            fixed = [lit for lit in fixed if lit == _var(lit)]
+        else:
+            fixed = fixed + [neg(var) for var in self.free]
+        return list(solution) + [lit for lit in fixed if not _is_aux(lit)]
+    def itersolve(self, include_neg=False, expand=False):
+        '''Solutions of the original cnf rebuilt from the simplified one
+
+           With expand=True every assignment of the free variables is
+           yielded; without pure literal elimination that reproduces
+           itersolve() on the original cnf exactly.
+        '''
+        free = [var for var in self.free if not _is_aux(var)]
+        for solution in itersolve(self.cnf, include_neg):
+            base = self.extend(solution, include_neg)
+            if not expand:
+                yield base
+                continue
+            if include_neg:
+                base = [lit for lit in base if _var(lit) not in free]
+            for signs in product((True, False), repeat=len(free)):
+                yield base + [var if sign else neg(var)
+                              for var, sign in zip(free, signs)
+                              if sign or include_neg]
+    def __repr__(self) -> str:
+        return (f'{self.__class__.__name__}(clauses={len(self.cnf)}, '
+                f'units={len(self.units)}, pure={len(self.pure)}, '
+                f'free={len(self.free)})')
+
+def _is_aux(literal) -> bool:
+    return not isinstance(literal, int) and is_aux(literal)
+
+def simplify(cnf, pure_literals=True) -> Simplified:
+    '''Shrink a cnf before translate()
+
+       Clauses are deduplicated regardless of literal order, tautologies
+       dropped, units propagated, subsumed clauses removed and, optionally,
+       pure literals eliminated.  Only pure literal elimination changes the
+       set of models (it keeps satisfiability), so leave it off when the
+       full solution set matters.
+
+        >>> simplify([('a', 'b'), ('b', 'a'), ('~a',), ('b', 'c', 'd')]).units
+        ['~a', 'b']
+    '''
+    clauses, variables = {}, {}
+    for clause in cnf:
+        clause = tuple(dict.fromkeys(clause))
+        variables.update((_var(lit), None) for lit in clause)
+        if any(neg(lit) in clause for lit in clause):
+            continue
+        clauses.setdefault(frozenset(clause), clause)
+    clauses = dict(enumerate(clauses.values()))
+    occurs = {}
+    for cid, clause in clauses.items():
+        for lit in clause:
+            occurs.setdefault(lit, set()).add(cid)
+    def remove(cid):
+        for lit in clauses.pop(cid):
+            occurs[lit].discard(cid)
+
+    # Unit propagation
+    units = []
+    queue = [clause[0] for clause in clauses.values() if len(clause) == 1]
+    assigned = set()
+    while queue:
+        lit = queue.pop()
+        if lit in assigned:
+            continue
+        if neg(lit) in assigned:
+            return Simplified([()], units, [], [])
+        assigned.add(lit)
+        units.append(lit)
+        for cid in list(occurs.get(lit, ())):
+            remove(cid)
+        for cid in list(occurs.get(neg(lit), ())):
+            clause = tuple(l for l in clauses[cid] if l != neg(lit))
+            occurs[neg(lit)].discard(cid)
+            if not clause:
+                return Simplified([()], units, [], [])
+            clauses[cid] = clause
+            if len(clause) == 1:
+                queue.append(clause[0])
+
+    # Backward subsumption, shortest clauses first
+    for cid in sorted(clauses, key=lambda cid: len(clauses[cid])):
+        if cid not in clauses:
+            continue
+        clause = clauses[cid]
+        rarest = min(clause, key=lambda lit: len(occurs[lit]))
+        members = set(clause)
+        for other in list(occurs[rarest]):
+            if other != cid and len(clauses[other]) >= len(clause) \
+                    and members.issubset(clauses[other]):
+                remove(other)
+
+    # Pure literals, until removing their clauses exposes no more
+    pure = []
+    while pure_literals:
+        found = [lit for lit, cids in occurs.items()
+                 if cids and not occurs.get(neg(lit))]
+        if not found:
+            break
+        for lit in found:
+            if not occurs[lit]:
+                continue                # Its clauses went with an earlier one
+            pure.append(lit)
+            for cid in list(occurs[lit]):
+                remove(cid)
+
+    remaining = {_var(lit) for clause in clauses.values() for lit in clause}
+    fixed = {_var(lit) for lit in units + pure}
+    free = [var for var in variables if var not in remaining | fixed]
+    return Simplified(list(clauses.values()), units, pure, free)
+
+############### Symmetry ###########################################
+
+def _refine(neighbours, colors, cells, dirty, expected=None) -> 'trace':
+    '''Split cells until the vertices of each see the same colours
+
+       Vertices are variables and clauses, neighbours[w] their (vertex,
+       negated) edges, and cells maps each colour to its vertices; both
+       are updated in place.  Only cells next to a vertex that changed
+       colour are looked at again.  A split keeps the old colour for the
+       group with the least signature and numbers the others next, so
+       equivalent partitions refine to the same colours.  Returns the
+       trace of splits; with expected, another run's trace, returns None
+       as soon as this run splits differently.
+    '''
+    def signature(w):
+        return tuple(sorted([2 * colors[x] + negated
+                             for x, negated in neighbours[w]]))
+
+    trace = []
+    while dirty:
+        touched = {w for x in dirty for w, _ in neighbours[x]}
+        dirty = []
+        for color in sorted({colors[w] for w in touched}):
+            if len(cells[color]) == 1:
+                continue
+            # Members nothing changed next to still share one signature
+            groups, shared = {}, None
+            for w in cells[color]:
+                if w in touched:
+                    key = signature(w)
+                else:
+                    key = shared = shared or signature(w)
+                groups.setdefault(key, []).append(w)
+            if len(groups) == 1:
+                continue
+            signatures = sorted(groups)
+            step = (color, [(sig, len(groups[sig])) for sig in signatures])
+            if expected is not None and (len(trace) == len(expected)
+                                         or expected[len(trace)] != step):
+                return None
+            trace.append(step)
+            cells[color] = groups[signatures[0]]
+            for key in signatures[1:]:
+                new = cells[len(cells)] = groups[key]
+                for x in new:
+                    colors[x] = len(cells) - 1
+                    touched.update(w for w, _ in neighbours[x])
+                dirty += new
+    if expected is not None and len(trace) != len(expected):
+        return None
+    return trace
+
+def _individualize(neighbours, partition, x, expected=None) -> 'partition':
+    'Give x a colour of its own and refine; None if expected is not met'
+    colors, cells, _ = partition
+    colors, cells = list(colors), dict(cells)
+    cells[colors[x]] = [w for w in cells[colors[x]] if w != x]
+    colors[x] = len(cells)
+    cells[colors[x]] = [x]
+    trace = _refine(neighbours, colors, cells, [x], expected)
+    return None if trace is None else (colors, cells, trace)
+
+def _automorphism(clauses, neighbours, partition, num_vars, u, v) \
+        -> 'permutation or None':
+    'Search for a clause-preserving permutation taking u to v'
+    a = _individualize(neighbours, partition, u)
+    b = _individualize(neighbours, partition, v, a[2])
+    if b is None:
+        return None
+    while True:
+        cells_a, cells_b = a[1], b[1]
+        split = min((color for color, cell in cells_a.items()
+                     if len(cell) > 1 and cell[0] <= num_vars), default=None)
+        if split is None:
+            perm = {cells_a[color][0]: cells_b[color][0] for color in cells_a
+                    if cells_a[color][0] <= num_vars}
+            break
+        x = cells_a[split][0]
+        targets = cells_b[split]
+        if x in targets:                # Prefer fixed points
+            targets = [x] + [y for y in targets if y != x]
+        a = _individualize(neighbours, a, x)
+        for y in targets:
+            candidate = _individualize(neighbours, b, y, a[2])
+            if candidate is not None:
+                b = candidate
+                break
+        else:
+            return None
+    clause_set = set(clauses)
+    for clause in clauses:
+        image = frozenset(perm[n] if n > 0 else -perm[-n] for n in clause)
+        if image not in clause_set:
+            return None
+    return {x: y for x, y in sorted(perm.items()) if x != y}
+
+def find_symmetries(cnf) -> 'generators':
+    '''Permutations of variables that map the clauses of cnf onto themselves
+
+       Variables are coloured by refining their clause occurrence patterns.
+       Mapping one variable of a colour onto the next, then pairing off
+       further variables until each stands alone, gives a candidate that
+       is kept only if every clause maps to a clause.  Returns dicts of
+       the moved variables; auxiliaries only ever map to auxiliaries.
+
+        >>> find_symmetries(one_of(['a', 'b', 'c']) + [('d', 'c')])
+        [{'a': 'b', 'b': 'a'}]
+    '''
+    numbered_cnf, num2var = translate(cnf)
+    clauses = list({frozenset(clause): None for clause in numbered_cnf})
+    num_vars = len(num2var) // 2
+    # Vertices: variables 1..num_vars, then one per clause
+    neighbours = [[] for _ in range(num_vars + 1)]
+    for cid, clause in enumerate(clauses, num_vars + 1):
+        neighbours.append([(abs(n), n < 0) for n in clause])
+        for n in clause:
+            neighbours[abs(n)].append((cid, n < 0))
+    kinds = [None] + [is_aux(num2var[num]) for num in range(1, num_vars + 1)]
+    kinds += [2] * len(clauses)
+    colors = [-1] * len(kinds)
+    cells = {}
+    for kind in (False, True, 2):       # Variables, auxiliaries, clauses
+        cell = [w for w in range(1, len(kinds)) if kinds[w] is kind]
+        if cell:
+            for w in cell:
+                colors[w] = len(cells)
+            cells[len(cells)] = cell
+    _refine(neighbours, colors, cells, list(range(1, len(kinds))))
+    partition = colors, cells, []
+
+    orbit = list(range(num_vars + 1))   # Union-find of known orbits
+    def find(num):
+        while orbit[num] != num:
+            orbit[num] = num = orbit[orbit[num]]
+        return num
+
+    generators = []
+    for cell in sorted(cells.values()):
+        if cell[0] > num_vars or is_aux(num2var[cell[0]]):
+            continue
+        for u, v in zip(cell, cell[1:]):
+            if find(u) == find(v):
+                continue
+            perm = _automorphism(clauses, neighbours, partition, num_vars,
+                                 u, v)
+            if perm is None:
+                continue
+            generators.append({num2var[x]: num2var[y]
+                               for x, y in perm.items()})
+            for x, y in perm.items():
+                orbit[find(x)] = find(y)
+    return generators
+
+def _lex_leader(generator, order) -> 'cnf':
+    'Clauses keeping only models no greater than their image, False < True'
+    moved = [var for var in order if var in generator]
+    cnf = []
+    equal = True                        # The prefix so far is unchanged
+    for i, x in enumerate(moved):
+        y = generator[x]
+        cnf.append(_clause(_negc(equal), neg(x), y))
+        if i == len(moved) - 1:
+            break
+        e = aux()                       # e <-> equal and x == y
+        cnf += filter(None, [_clause(neg(e), equal), (neg(e), x, neg(y)),
+                             _clause(_negc(equal), x, y, e),
+                             _clause(_negc(equal), neg(x), neg(y), e)])
+        equal = e
+    return cnf
+
+def _permute(solution, generator) -> 'solution':
+    return [lit if _var(lit) not in generator else
+            generator[lit] if lit in generator else neg(generator[lit[1:]])
+            for lit in solution]
+
+class Symmetric:
+    '''A cnf with lex-leader clauses keeping fewer models per symmetry
+
+       generators are the permutations that were broken and clauses the
+       lex-leader clauses added for them; cnf is the original plus clauses.
+       Every solution of the original is an image of a canonical one.
+    '''
+    def __init__(self, cnf, generators, clauses):
+        self.cnf, self.generators, self.clauses = cnf, generators, clauses
+    def expand(self, solutions) -> 'solutions':
+        'Close solutions under the generators, yielding each one once'
+        seen = set()
+        for solution in solutions:
+            if frozenset(solution) in seen:
+                continue
+            seen.add(frozenset(solution))
+            stack = [list(solution)]
+            while stack:
+                solution = stack.pop()
+                yield solution
+                for generator in self.generators:
+                    image = _permute(solution, generator)
+                    if frozenset(image) not in seen:
+                        seen.add(frozenset(image))
+                        stack.append(image)
+    def itersolve(self, include_neg=False, expand=False):
+        'Canonical solutions, or with expand=True all of them'
+        solutions = itersolve(self.cnf, include_neg)
+        return self.expand(solutions) if expand else solutions
+    def __repr__(self) -> str:
+        return (f'{self.__class__.__name__}(generators='
+                f'{len(self.generators)}, clauses={len(self.clauses)})')
+
+def break_symmetries(cnf, generators=None) -> Symmetric:
+    '''Add lex-leader clauses for the symmetries of cnf
+
+       With generators=None they come from find_symmetries().  Variables
+       are ordered by first appearance, and each generator keeps only the
+       models that are lexicographically no greater than their image.
+
+        >>> broken = break_symmetries(one_of(['a', 'b', 'c']))
+        >>> list(broken.itersolve())
+        [['c']]
+        >>> sorted(broken.itersolve(expand=True))
+        [['a'], ['b'], ['c']]
+    '''
+    cnf = list(cnf)
+    if generators is None:
+        generators = find_symmetries(cnf)
+    order = [var for var in make_translate(cnf)[1].values()
+             if var[0] != '~' and not is_aux(var)]
+    clauses = []
+    for generator in generators:
+        clauses += _lex_leader(generator, order)
+    return Symmetric(cnf + clauses, generators, clauses)
+
+############### Optimisation #######################################
+
+def maxsat(hard, soft, top=1, backend=None) -> 'ranked':
+    '''Weighted MaxSAT: solutions of hard with the least soft weight broken
+
+       soft is (weight, clause) pairs with positive integer weights.  Each
+       soft clause gets a relaxation literal that is true exactly when the
+       clause is broken.  An adder network sums their weights in binary
+       and a totalizer counts them; the search allows at most k broken
+       clauses for k = 0, 1, 3, 7, ... and binary searches the sum below
+       the best cost so far, stopping once k + 1 of the lightest clauses
+       would cost at least that much.  Returns up to top (cost, solution)
+       pairs, cheapest first.
+
+        >>> maxsat(one_of(['a', 'b']), [(3, ('a',)), (5, ('b',))])
+        [(3, ['b'])]
+    '''
+    soft = [(weight, tuple(clause)) for weight, clause in soft if weight]
+    if any(weight < 0 or weight != int(weight) for weight, _ in soft):
+        raise ValueError('Soft clause weights must be positive integers')
+    unit = gcd(*(weight for weight, _ in soft)) or 1
+    solver = Solver(hard, backend)
+    terms = []
+    for weight, clause in soft:
+        if len(clause) == 1:
+            relax = neg(clause[0])
+        else:
+            relax = aux()
+            solver.add(_define(relax, map(neg, clause), conjunction=True))
+        terms.append((relax, weight // unit))
+    bits, cnf = _weighted_sum(terms)
+    solver.add(cnf)
+    results = []
+    while len(results) < top:
+        best = _minimize(solver, soft, terms, bits, unit)
+        if best is None:
+            break
+        cost, model = best
+        results.append((cost, [lit for lit in model if lit[0] != '~']))
+        solver.add([tuple(map(neg, model))])   # Next best must differ
+    return results
+
+def _cost(soft, model) -> int:
+    true = set(model)
+    return sum(weight for weight, clause in soft
+               if not any(lit in true for lit in clause))
+
+def _minimize(solver, soft, terms, bits, unit) -> '(cost, model)':
+    model = next(solver.itersolve(include_neg=True), None)
+    if model is None:
+        return None
+    best = _cost(soft, model) // unit
+    relaxes = tuple(relax for relax, _ in terms)
+    lightest = min((weight for _, weight in terms), default=0)
+    k, low, improved, counter = 0, 0, False, None
+    solver.push()                       # The counter, rebuilt as k grows
+    while best:
+        if counter is None or len(counter) <= min(k + 1, len(relaxes)):
+            solver.pop()
+            solver.push()
+            cnf = []
+            counter = _totalize(relaxes, 2 * (k + 1), cnf, aux)
+            solver.add([clause for clause in cnf if clause is not None])
+        bound = (low + best - 1) // 2 if improved else best - 1
+        solver.push()
+        solver.add(_at_most_sum(bits, bound))
+        if k + 1 < len(counter):
+            solver.add([(neg(counter[k + 1]),)])
+        found = next(solver.itersolve(include_neg=True), None)
+        solver.pop()
+        if found is not None:
+            model, best, improved = found, _cost(soft, found) // unit, True
+        elif bound < best - 1:
+            low = bound + 1             # Only for this k
+        elif k >= len(relaxes) or (k + 1) * lightest >= best:
+            break                       # Breaking more can't be cheaper
+        else:
+            k, low, improved = min(2 * k + 1, len(relaxes)), 0, False
+    solver.pop()
+    return best * unit, model
+
+def _weighted_sum(terms) -> ('bits', 'cnf'):
+    '''Adder network for the total weight of the true literals in
+       (literal, weight) terms, as bits least significant first
+
+       Each set bit of a weight puts its literal in that bit's column.
+       Adders replace up to three literals of a column with their sum
+       bit and carry the rest into the next column.
+    '''
+    columns = {}
+    for literal, weight in terms:
+        for j in range(weight.bit_length()):
+            if weight >> j & 1:
+                columns.setdefault(j, deque()).append(literal)
+    bits, cnf = [], []
+    for j in count():
+        if j > max(columns, default=-1):
+            return bits, cnf
+        column = columns.get(j, deque())
+        while len(column) > 1:
+            inputs = [column.popleft() for _ in range(min(3, len(column)))]
+            total, carry = aux(), aux()
+            cnf += _define_parity(total, inputs)
+            cnf += _define_carry(carry, inputs)
+            column.append(total)
+            columns.setdefault(j + 1, deque()).append(carry)
+        bits.append(column[0] if column else False)
+
+def _define_parity(out, inputs) -> 'cnf':
+    'Clauses for out <-> XOR(inputs), one per assignment of the inputs'
+    cnf = []
+    for signs in product((False, True), repeat=len(inputs)):
+        clause = [neg(lit) if sign else lit
+                  for lit, sign in zip(inputs, signs)]
+        cnf.append((*clause, out if sum(signs) % 2 else neg(out)))
+    return cnf
+
+def _define_carry(out, inputs) -> 'cnf':
+    'Clauses for out <-> at least two of the inputs'
+    others = len(inputs) - 1
+    return [(neg(a), neg(b), out) for a, b in combinations(inputs, 2)] + \
+           [(*lits, neg(out)) for lits in combinations(inputs, others)]
+
+def _at_most_sum(bits, k) -> 'cnf':
+    'Clauses for the binary number in bits, least significant first, <= k'
+    cnf = []
+    for j, bit in enumerate(bits):
+        if not k >> j & 1:
+            # Where k has a 0, the sum can't have a 1 and match k above it
+            higher = [_negc(bits[i]) for i in range(j + 1, len(bits))
+                      if k >> i & 1]
+            cnf.append(_clause(_negc(bit), *higher))
+    if k >> len(bits):
+        return []                       # Wider than any sum of the bits
+    return [clause for clause in cnf if clause is not None]
 
 ############### Support for Building CNFs ##########################
 
-@lru_cache(maxsize=None)
 def neg(element) -> 'element':
     'Negate a single element'
+    if isinstance(element, int):
+        return -element
+    return _neg_symbol(element)
+
+@lru_cache(maxsize=None)
+def _neg_symbol(element) -> 'element':
     return intern(element[1:] if element.startswith('~') else '~' + element)
 
-def from_dnf(groups) -> 'cnf':
-    'Convert from or-of-ands to and-of-ors'
+AUX_PREFIX = '#'
+_aux_numbers = count(1)
+
+def aux() -> 'element':
+    'Fresh auxiliary variable, hidden from the solutions of itersolve()'
+    return intern(f'{AUX_PREFIX}{next(_aux_numbers)}')
+
+def is_aux(element) -> bool:
+    'Is this literal an auxiliary variable introduced by an encoding?'
+    return element.lstrip('~').startswith(AUX_PREFIX)
+
+def _new_var(pool, elements=()) -> 'callable':
+    'Source of auxiliary variables matching the kind of literals in use'
+    if pool is not None:
+        return pool.aux
+    if any(isinstance(element, int) for element in elements):
+        raise ValueError('Integer literals need a pool= for auxiliaries')
+    return aux
+
+class _Names(dict):
+    'num2var for a VarPool, formatting each name on first lookup'
+    def __init__(self, pool):
+        self.pool = pool
+    def __missing__(self, num):
+        if not num or abs(num) >= len(self.pool.keys):
+            raise KeyError(num)
+        key = self.pool.keys[abs(num)]
+        # Auxiliaries are named by aux(), so they can't clash with those of
+        # symbolic encodings or other pools sharing a buffer
+        var = aux() if key is None else intern(self.pool.formatter(*key))
+        self[abs(num)], self[-abs(num)] = var, intern('~' + var)
+        return self[num]
+
+class VarPool:
+    '''Integer literals handed out directly from structured keys
+
+        >>> pool = VarPool()
+        >>> pool('Brandi', 'month', 'March'), pool('Lee', 'month', 'May')
+        (1, 2)
+        >>> pool.num2var[-2]
+        '~Lee month May'
+
+       Pool literals are plain ints, so neg() and the cnf helpers work on
+       them without make_translate.  Pass pool= to the helpers that need
+       auxiliaries and to itersolve()/solve_all()/solve_one().  Pool
+       auxiliaries are named by aux() when first looked up, so they stay
+       distinct from symbolic ones in a shared CNFBuffer.
+    '''
+    def __init__(self, formatter=None):
+        self.lit2num = {}
+        self.keys = [None]              # keys[num]; None marks an auxiliary
+        self.formatter = formatter or (lambda *key: ' '.join(map(str, key)))
+        self.num2var = _Names(self)
+    def __call__(self, *key) -> int:
+        try:
+            return self.lit2num[key]
+        except KeyError:
+            num = self.lit2num[key] = len(self.keys)
+            self.keys.append(key)
+            return num
+    def aux(self) -> int:
+        'Fresh auxiliary variable, hidden from the solutions of itersolve()'
+        self.keys.append(None)
+        return len(self.keys) - 1
+    def is_aux(self, literal: int) -> bool:
+        return self.keys[abs(literal)] is None
+    def key(self, literal: int) -> tuple:
+        'Structured key for a literal'
+        return self.keys[abs(literal)]
+    def __len__(self) -> int:
+        return len(self.keys) - 1
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(vars={len(self)})'
+
+def from_dnf(groups, tseitin=False, pool=None) -> 'cnf':
+    '''Convert from or-of-ands to and-of-ors
+
+       Distributing OR over AND grows exponentially with the number of
+       groups.  With tseitin=True each group gets an auxiliary selector
+       variable equivalent to its conjunction instead, giving a linear
+       size, equisatisfiable cnf.  Integer literals need a VarPool.
+    '''
+    if tseitin:
+        return _from_dnf_tseitin(groups, pool)
     cnf = {frozenset()}
     for group in groups:
         nl = {frozenset([literal]) : neg(literal) for literal in group}
@@ -66,20 +1553,196 @@ def from_dnf(groups) -> 'cnf':
         # The sc check removes clauses with superfluous terms:
         #     {{x}, {x, z}, {y, z}} -> {{x}, {y, z}}
         # Should this be left until the end?
-        sc = min(cnf, key=len)          # XXX not deterministic
+        shortest = min(map(len, cnf))   # Break ties by content, not hash
+        sc = min((c for c in cnf if len(c) == shortest), key=sorted)
         cnf -= {clause for clause in cnf if clause > sc}
     return list(map(tuple, cnf))
 
+def _from_dnf_tseitin(groups, pool) -> 'cnf':
+    cnf, selectors = [], []
+    groups = [tuple(dict.fromkeys(group)) for group in groups]
+    new = _new_var(pool, [literal for group in groups for literal in group])
+    for group in groups:
+        if any(neg(literal) in group for literal in group):
+            continue                    # {x, ~x, y} can never be true
+        if len(group) == 0:
+            return []                   # An empty conjunction is always true
+        if len(group) == 1:
+            selectors.append(group[0])
+            continue
+        selector = new()
+        cnf += _define(selector, group, conjunction=True)
+        selectors.append(selector)
+    return cnf + [tuple(dict.fromkeys(selectors))]
+
+############### Cardinality Encodings ##############################
+
+# Every encoding below defines its auxiliary variables by equivalences, so
+# each assignment of the elements extends to exactly one assignment of the
+# auxiliaries and solve_all() still yields one solution per answer.
+
+def _clause(*literals) -> 'clause or None':
+    'Drop False constants; None if a True constant satisfies the clause'
+    if any(lit is True for lit in literals):
+        return None
+    return tuple(lit for lit in literals if lit is not False)
+
+def _negc(literal) -> 'element':
+    'Negate an element or a True/False constant'
+    return not literal if isinstance(literal, bool) else neg(literal)
+
+def _define(out, inputs, conjunction) -> 'cnf':
+    'Clauses for out <-> AND(inputs) or out <-> OR(inputs)'
+    inputs = tuple(inputs)
+    if conjunction:
+        return [(neg(out), lit) for lit in inputs] + \
+               [(out, *map(neg, inputs))]
+    return [(out, neg(lit)) for lit in inputs] + [(neg(out), *inputs)]
+
+def _at_most_pairwise(elements, k, new) -> 'cnf':
+    return list(combinations(map(neg, elements), k + 1))
+
+def _at_most_seqcounter(elements, k, new) -> 'cnf':
+    'Sinz sequential counter: s[i][j] <-> at least j of elements[:i+1]'
+    cnf = []
+    prev = [True]                       # prev[j]: at least j of the prefix
+    for i, x in enumerate(elements):
+        if i:
+            cnf.append((neg(prev[k]), neg(x)) if len(prev) > k else None)
+        width = min(i + 1, k)
+        cur = [True] + [new() for j in range(width)]
+        for j in range(1, width + 1):
+            below = prev[j] if j < len(prev) else False
+            carry = prev[j - 1]
+            cnf += [
+                _clause(_negc(below), cur[j]),
+                _clause(_negc(carry), neg(x), cur[j]),
+                _clause(neg(cur[j]), below, carry),
+                _clause(neg(cur[j]), below, x),
+            ]
+        prev = cur
+    return [c for c in cnf if c is not None]
+
+def _totalize(elements, bound, cnf, new) -> 'unary counter':
+    'Bailleux-Boufkhad totalizer: out[j] <-> at least j elements, j <= bound'
+    if len(elements) == 1:
+        return [True, elements[0]]
+    half = len(elements) // 2
+    a = _totalize(elements[:half], bound, cnf, new)
+    b = _totalize(elements[half:], bound, cnf, new)
+    top = min(len(elements), bound)
+    out = [True] + [new() for j in range(top)]
+    get = lambda unary, j: unary[j] if j < len(unary) else False
+    for alpha in range(len(a)):
+        for beta in range(len(b)):
+            sigma = alpha + beta
+            if 1 <= sigma <= top:
+                cnf.append(_clause(_negc(a[alpha]), _negc(b[beta]),
+                                   out[sigma]))
+            if sigma + 1 <= top:
+                cnf.append(_clause(get(a, alpha + 1), get(b, beta + 1),
+                                   neg(out[sigma + 1])))
+    return out
+
+def _at_most_totalizer(elements, k, new) -> 'cnf':
+    cnf = []
+    out = _totalize(tuple(elements), k + 1, cnf, new)
+    cnf.append((neg(out[k + 1]),))
+    return [c for c in cnf if c is not None]
+
+def _comparators(n) -> 'pairs':
+    'Batcher odd-even merge sort network on n (a power of 2) wires'
+    p = 1
+    while p < n:
+        k = p
+        while k >= 1:
+            for j in range(k % p, n - k, 2 * k):
+                for i in range(min(k, n - j - k)):
+                    if (i + j) // (2 * p) == (i + j + k) // (2 * p):
+                        yield i + j, i + j + k
+            k //= 2
+        p *= 2
+
+def _at_most_sortnet(elements, k, new) -> 'cnf':
+    'Sort descending through a comparator network and forbid wire k'
+    n = 1 << (len(elements) - 1).bit_length()
+    network = list(_comparators(n))
+    # Walk backwards to find which comparator outputs reach wire k
+    live, wanted = {k}, []
+    for hi, lo in reversed(network):
+        want = (hi in live, lo in live)
+        wanted.append(want)
+        if any(want):
+            live |= {hi, lo}
+    wires = list(elements) + [False] * (n - len(elements))
+    cnf = []
+    for (hi, lo), (want_max, want_min) in zip(network, reversed(wanted)):
+        a, b = wires[hi], wires[lo]
+        if isinstance(a, bool) or isinstance(b, bool):
+            consts = (a, b) if isinstance(a, bool) else (b, a)
+            const, other = consts
+            wires[hi], wires[lo] = (True, other) if const else (other, False)
+            continue
+        wires[hi] = wires[lo] = None
+        if want_max:
+            wires[hi] = new()
+            cnf += _define(wires[hi], (a, b), conjunction=False)
+        if want_min:
+            wires[lo] = new()
+            cnf += _define(wires[lo], (a, b), conjunction=True)
+    return cnf + [c for c in [_clause(_negc(wires[k]))] if c is not None]
+
+ENCODINGS = {
+    'pairwise': _at_most_pairwise,
+    'seqcounter': _at_most_seqcounter,
+    'totalizer': _at_most_totalizer,
+    'sortnet': _at_most_sortnet,
+}
+
+# Above this many pairwise clauses, encoding=None switches to DEFAULT_ENCODING
+PAIRWISE_LIMIT = 64
+DEFAULT_ENCODING = 'seqcounter'
+
+def at_most(elements, k: int, encoding=None, pool=None) -> 'cnf':
+    'At most k of the elements are true'
+    elements = tuple(elements)
+    pairwise = comb(len(elements), k + 1) if k >= 0 else 0
+    if encoding is None:
+        encoding = (DEFAULT_ENCODING if pairwise > PAIRWISE_LIMIT
+                    else 'pairwise')
+    if encoding not in ENCODINGS:
+        raise ValueError(f'Unknown encoding {encoding!r}; '
+                         f'choose from {sorted(ENCODINGS)}')
+    if k < 0 or pairwise <= len(elements):
+        # Trivial bounds are already linear, no auxiliaries needed
+        encoding = 'pairwise'
+        new = None
+    else:
+        new = _new_var(pool, elements)
+    return ENCODINGS[encoding](elements, k, new)
+
+def at_least(elements, k: int, encoding=None, pool=None) -> 'cnf':
+    'At least k of the elements are true'
+    elements = tuple(elements)
+    return at_most(map(neg, elements), len(elements) - k, encoding, pool)
+
 class Q:
-    'Quantifier for the number of elements that are true'
-    def __init__(self, elements):
+    '''Quantifier for the number of elements that are true
+
+       The encoding is one of ENCODINGS; None picks pairwise combinations
+       for small constraints and DEFAULT_ENCODING past PAIRWISE_LIMIT clauses.
+       Auxiliaries for integer literals come from the VarPool given as pool.
+    '''
+    def __init__(self, elements, encoding=None, pool=None):
         self.elements = tuple(elements)
+        self.encoding = encoding
+        self.pool = pool
     def __lt__(self, n: int) -> 'cnf':
-        return list(combinations(map(neg, self.elements), n))
+        return at_most(self.elements, n - 1, self.encoding, self.pool)
     def __le__(self, n: int) -> 'cnf':
         return self < n + 1
     def __gt__(self, n: int) -> 'cnf':
-        return list(combinations(self.elements, len(self.elements)-n))
+        return at_least(self.elements, n + 1, self.encoding, self.pool)
     def __ge__(self, n: int) -> 'cnf':
         return self > n - 1
     def __eq__(self, n: int) -> 'cnf':
@@ -93,18 +1756,18 @@ def all_of(elements) -> 'cnf':
     'Forces inclusion of matching rows on a truth table'
     return Q(elements) == len(elements)
 
-def some_of(elements) -> 'cnf':
+def some_of(elements, encoding=None, pool=None) -> 'cnf':
     'At least one of the elements must be true'
-    return Q(elements) >= 1
+    return Q(elements, encoding, pool) >= 1
 
-def one_of(elements) -> 'cnf':
+def one_of(elements, encoding=None, pool=None) -> 'cnf':
     'Exactly one of the elements is true'
-    return Q(elements) == 1
+    return Q(elements, encoding, pool) == 1
 
 def basic_fact(element) -> 'cnf':
     'Assert that this one element always matches'
     return Q([element]) == 1
 
-def none_of(elements) -> 'cnf':
+def none_of(elements, encoding=None, pool=None) -> 'cnf':
     'Forces exclusion of matching rows on a truth table'
-    return Q(elements) == 0
+    return Q(elements, encoding, pool) == 0
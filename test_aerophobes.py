@@ -33,25 +33,17 @@ def test_clue_3():
     """Assert Wyoming traveler leaves 2 months before Peggy."""
     clues = (aerophobes.clue_3,)
     statement = aerophobes.aerophobes(*clues, charms=False)
+    grid = aerophobes.grid(state=aerophobes.STATES, month=aerophobes.MONTHS)
 
     all_solutions = sat_utils.solve_all(statement)
     assert len(all_solutions) > 0
 
     for solution in all_solutions:
-        peggy_month, wyoming_traveler = None, None
-        for statement in solution:
-            if statement.startswith("Peggy traveled in "):
-                *_, peggy_month = statement.split("Peggy traveled in ")
-            elif statement.endswith(" traveled to Wyoming"):
-                wyoming_traveler, *_ = statement.split(" traveled to Wyoming")
-
-        wyoming_month = None
-        for statement in solution:
-            if statement.startswith(f"{wyoming_traveler} traveled in "):
-                *_, wyoming_month = statement.split(f"{wyoming_traveler} traveled in ")  # noqa
+        records = {r.subject: r for r in grid.records(solution)}
+        wyoming, = (r for r in records.values() if r.state == "Wyoming")
 
-        wyoming_month_index = aerophobes.MONTHS.index(wyoming_month)
-        peggy_month_index = aerophobes.MONTHS.index(peggy_month)
+        wyoming_month_index = aerophobes.MONTHS.index(wyoming.month)
+        peggy_month_index = aerophobes.MONTHS.index(records["Peggy"].month)
 
         assert peggy_month_index - 2 == wyoming_month_index
 
@@ -72,22 +64,16 @@ def test_clue_5():
     """Assert Lee leaves 1 month after Peggy."""
     clues = (aerophobes.clue_5,)
     statement = aerophobes.aerophobes(*clues, charms=False, states=False)
+    grid = aerophobes.grid(month=aerophobes.MONTHS)
 
     all_solutions = sat_utils.solve_all(statement)
     assert len(all_solutions) > 0
 
     for solution in all_solutions:
-        lee_month, peggy_month = None, None
-        for statement in solution:
-            if statement.startswith("Lee traveled in "):
-                *_, lee_month = statement.split("Lee traveled in ")
-            elif statement.startswith("Peggy traveled in "):
-                *_, peggy_month = statement.split("Peggy traveled in ")
-
-        print(f"Peggy {peggy_month}, Lee {lee_month}")
+        records = {r.subject: r for r in grid.records(solution)}
 
-        peggy_month_index = aerophobes.MONTHS.index(peggy_month)
-        lee_month_index = aerophobes.MONTHS.index(lee_month)
+        peggy_month_index = aerophobes.MONTHS.index(records["Peggy"].month)
+        lee_month_index = aerophobes.MONTHS.index(records["Lee"].month)
 
         assert peggy_month_index + 1 == lee_month_index
 
@@ -116,30 +102,17 @@ def test_clue_7():
     """Assert the shamrock traveler leaves after Rudy."""
     clues = (aerophobes.clue_7,)
     statement = aerophobes.aerophobes(*clues, states=False)
+    grid = aerophobes.grid(charm=aerophobes.CHARMS, month=aerophobes.MONTHS)
 
     all_solutions = sat_utils.solve_all(statement)
     assert len(all_solutions) > 0
 
     for solution in all_solutions:
-        rudy_month, shamrock_traveler = None, None
-        for statement in solution:
-            if statement.startswith("Rudy traveled in "):
-                *_, rudy_month = statement.split("Rudy traveled in ")
-            elif statement.endswith("'s lucky charm is a shamrock"):
-                shamrock_traveler, *_ = statement.split("'s lucky charm is a shamrock")  # noqa
-
-        # NOTE Do we want the clue to make this assumption?
-        if rudy_month == "May":
-            continue
-
-        shamrock_month = None
-        for statement in solution:
-            if statement.startswith(f"{shamrock_traveler} traveled in "):
-                *_, shamrock_month = statement.split(f"{shamrock_traveler} traveled in ")  # noqa
-                break
+        records = {r.subject: r for r in grid.records(solution)}
+        shamrock, = (r for r in records.values() if r.charm == "shamrock")
 
-        shamrock_month_index = aerophobes.MONTHS.index(shamrock_month)
-        rudy_month_index = aerophobes.MONTHS.index(rudy_month)
+        shamrock_month_index = aerophobes.MONTHS.index(shamrock.month)
+        rudy_month_index = aerophobes.MONTHS.index(records["Rudy"].month)
 
         assert shamrock_month_index > rudy_month_index
 
@@ -179,25 +152,17 @@ def test_clue_10():
     """Assert the flier going to Utah leaves a month before Rudy."""
     clues = (aerophobes.clue_10,)
     statement = aerophobes.aerophobes(*clues, charms=False)
+    grid = aerophobes.grid(state=aerophobes.STATES, month=aerophobes.MONTHS)
 
     all_solutions = sat_utils.solve_all(statement)
     assert len(all_solutions) > 0
 
     for solution in all_solutions:
-        rudy_month, utah_traveler = None, None
-        for statement in solution:
-            if statement.startswith("Rudy traveled in "):
-                *_, rudy_month = statement.split("Rudy traveled in ")
-            elif statement.endswith(" traveled to Utah"):
-                utah_traveler, *_ = statement.split(" traveled to Utah")
-
-        utah_month = None
-        for statement in solution:
-            if statement.startswith(f"{utah_traveler} traveled in "):
-                *_, utah_month = statement.split(f"{utah_traveler} traveled in ")  # noqa
+        records = {r.subject: r for r in grid.records(solution)}
+        utah, = (r for r in records.values() if r.state == "Utah")
 
-        utah_month_index = aerophobes.MONTHS.index(utah_month)
-        rudy_month_index = aerophobes.MONTHS.index(rudy_month)
+        utah_month_index = aerophobes.MONTHS.index(utah.month)
+        rudy_month_index = aerophobes.MONTHS.index(records["Rudy"].month)
 
         assert rudy_month_index - 1 == utah_month_index
 
@@ -242,3 +207,28 @@ def test_aerophobes():
         "Rudy traveled to Wyoming",
         "Rudy's lucky charm is a wishbone",
     ]
+
+
+def test_break_symmetries():
+    """Assert interchangeable fliers and months are solved once."""
+    statement = aerophobes.aerophobes(
+        aerophobes.clue_1, states=False, charms=False,
+    )
+    broken = sat_utils.break_symmetries(statement)
+
+    assert len(list(broken.itersolve())) < 96
+    assert len(list(broken.itersolve(expand=True))) == 96
+    assert sat_utils.count_solutions(statement) == 96
+
+
+def test_backbone():
+    """Assert the backbone of a partial grid matches its solutions."""
+    statement = aerophobes.aerophobes(
+        aerophobes.clue_4, aerophobes.clue_5, aerophobes.clue_9,
+    )
+    solutions = sat_utils.solve_all(statement, include_neg=True)
+
+    forced = sat_utils.backbone(statement)
+    assert set(forced) == set.intersection(*map(set, solutions))
+    assert aerophobes._flew_with("Peggy", "horseshoe") in forced
+    assert sat_utils.neg(aerophobes._flew_in("Lee", "January")) in forced
@@ -0,0 +1,68 @@
+"""Tests for sat_examples/examples/aio.py"""
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from examples import aio
+from examples import sat_utils
+from examples.puzzles import comets
+
+
+def _pigeonhole(holes):
+    """Return the statement that holes + 1 pigeons fit in holes, one each."""
+    statement = list()
+    for pigeon in range(holes + 1):
+        statement += sat_utils.some_of(f"{pigeon} in {hole}" for hole in range(holes))  # noqa
+    for hole in range(holes):
+        statement += sat_utils.at_most([f"{pigeon} in {hole}" for pigeon in range(holes + 1)], 1)  # noqa
+    return statement
+
+
+def test_solve_all():
+    """Assert a solve runs to completion in a worker process."""
+    result = asyncio.run(aio.solve_all(comets.comets()))
+
+    assert result.status == aio.SAT and result.complete
+    assert result.solutions == sat_utils.solve_all(comets.comets())
+
+    result = asyncio.run(aio.solve_one([("a",), ("~a",)]))
+    assert result == (aio.UNSAT, [], True)
+
+
+def test_limits():
+    """Assert partial solutions are kept when a solve is cut short."""
+    statement = sat_utils.at_most([f"x{i}" for i in range(30)], 3)
+
+    result = asyncio.run(aio.solve_all(statement, limit=5))
+    assert result.status == aio.SAT and len(result.solutions) == 5
+    assert not result.complete
+
+    result = asyncio.run(aio.solve_one(_pigeonhole(9), prop_limit=1000))
+    assert result == (aio.UNKNOWN, [], False)
+
+
+def test_timeout():
+    """Assert a hard instance gives up after the timeout."""
+    start = time.perf_counter()
+    result = asyncio.run(aio.solve_one(_pigeonhole(11), timeout=0.5))
+
+    assert result == (aio.UNKNOWN, [], False)
+    assert time.perf_counter() - start < 10
+    assert not multiprocessing.active_children()
+
+
+def test_cancel():
+    """Assert cancelling the awaiting task kills the worker."""
+    async def cancel():
+        task = asyncio.create_task(aio.solve_one(_pigeonhole(11)))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    for process in multiprocessing.active_children():
+        process.join(5)
+    assert not multiprocessing.active_children()
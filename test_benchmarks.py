@@ -0,0 +1,26 @@
+"""Tests for the benchmark problem generators."""
+import json
+
+import benchmarks.__main__
+from benchmarks import generators
+from examples import sat_utils
+
+
+def test_logic_grid_is_solvable():
+    """Assert generated grids are satisfiable and seeded deterministically."""
+    statement = generators.logic_grid(5, seed=3)
+
+    assert statement == generators.logic_grid(5, seed=3)
+    assert len(sat_utils.solve_one(statement)) == 5 * 3
+
+
+def test_benchmark_output(capsys):
+    """Assert every phase is reported as machine-readable JSON."""
+    benchmarks.__main__.main(["logic_grid", "--sizes", "3", "4", "--limit", "5"])  # noqa
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]  # noqa
+    assert [r["size"] for r in results] == [3, 4]
+    for result in results:
+        assert result["solutions"] >= 1
+        assert result["clauses"] > 0
+        assert {"build_seconds", "translate_seconds", "solve_seconds"} <= result.keys()  # noqa
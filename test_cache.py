@@ -0,0 +1,104 @@
+"""Tests for sat_examples/examples/cache.py"""
+import os
+import subprocess
+import sys
+
+from examples import cache
+from examples import sat_utils
+from examples.puzzles import comets
+
+
+def test_fingerprint_ignores_order():
+    """Assert clause order, literal order and auxiliary names don't matter."""
+    elements = [f"x{i}" for i in range(12)]
+    first = sat_utils.one_of(elements, encoding="seqcounter") + [("a", "~b")]
+    second = [("~b", "a")] + sat_utils.one_of(elements, encoding="seqcounter")
+    second = [clause[::-1] for clause in reversed(second)]
+
+    assert first != second
+    assert cache.fingerprint(first) == cache.fingerprint(second)
+    assert cache.fingerprint(first) != cache.fingerprint(first + [("c",)])
+
+
+def test_fingerprint_is_canonical_for_auxiliaries():
+    """Assert rebuilding a constraint with auxiliaries keeps its key."""
+    elements = [f"x{i}" for i in range(12)]
+
+    def build():
+        return sat_utils.Q(elements, encoding="seqcounter") <= 3
+
+    keys = {cache.fingerprint(build()) for _ in range(5)}
+    keys.add(cache.fingerprint(list(reversed(build()))))
+    assert len(keys) == 1
+    assert cache.fingerprint(build()) != cache.fingerprint(
+        sat_utils.Q(elements, encoding="seqcounter") <= 2
+    )
+
+
+def test_fingerprint_ignores_hash_seed():
+    """Assert separate runs agree on the key, whatever their hash seed."""
+    code = (
+        "from examples import cache, sat_utils;"
+        "elements = [f'x{i}' for i in range(12)];"
+        "print(cache.fingerprint(sat_utils.Q(elements, encoding='seqcounter') <= 3))"  # noqa
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True,
+            check=True, env={**os.environ, "PYTHONHASHSEED": str(seed)},
+        ).stdout
+        for seed in range(1, 5)
+    }
+    assert len(keys) == 1
+
+
+def test_shared_key_needs_same_layout(tmp_path):
+    """Assert statements sharing a key never share cached solutions."""
+    x, y = sat_utils.aux(), sat_utils.aux()
+    first = [("a", x), (f"~{x}", "b"), ("c", y), (f"~{y}", "d")]
+    second = [("a", x), (f"~{y}", "b"), ("c", y), (f"~{x}", "d")]
+    assert cache.fingerprint(first) == cache.fingerprint(second)
+
+    cnf_cache = cache.CNFCache(tmp_path)
+    for statement in (first, second, first):
+        expected = sorted(map(sorted, sat_utils.solve_all(statement)))
+        assert sorted(map(sorted, cnf_cache.solve_all(statement))) == expected  # noqa
+
+
+def test_dumps_round_trip():
+    """Assert the binary format keeps clauses, names and models."""
+    numbered_cnf, num2var = sat_utils.translate([("a", "~b"), ("b", "c", "d")])
+    solutions = [[1, 2, -3, 4], [-1, -2, 3, -4]]
+
+    assert cache.loads(cache.dumps(numbered_cnf, num2var, solutions)) == (numbered_cnf, num2var, solutions)  # noqa
+    assert cache.loads(cache.dumps(numbered_cnf, num2var))[2] is None
+
+
+class Unsolvable:
+    """A backend for asserting the cache answered without solving."""
+
+    def itersolve(self, numbered_cnf):
+        raise AssertionError("Solved instead of using the cache")
+
+
+def test_cached_solve_all(tmp_path):
+    """Assert cached results match a fresh solve and are reused."""
+    cnf_cache = cache.CNFCache(tmp_path)
+    statement = comets.comets()
+
+    expected = sat_utils.solve_all(statement)
+    assert cnf_cache.solve_all(statement) == expected
+    assert len(os.listdir(tmp_path)) == 1
+
+    entry = cnf_cache.get(cache.fingerprint(statement))
+    assert entry is not None and len(entry[2]) == 1
+    assert cnf_cache.solve_all(comets.comets(), backend=Unsolvable()) == expected  # noqa
+
+
+def test_eviction(tmp_path):
+    """Assert the least recently used entries go first."""
+    cnf_cache = cache.CNFCache(tmp_path, max_bytes=0)
+    cnf_cache.solve_all([("a", "b")])
+    cnf_cache.solve_all([("c", "d")])
+
+    assert os.listdir(tmp_path) == [f"{cache.fingerprint([('c', 'd')])}.cnf.z"]  # noqa
@@ -1,5 +1,9 @@
 """Tests for the puzzles, so I can refactor them without going crazy."""
+import subprocess
+import sys
+
 import examples
+import examples.puzzles
 import examples.puzzles.comets
 
 
@@ -9,6 +13,7 @@ def test_comets():
     solutions = examples.sat_utils.solve_all(statement)
 
     assert len(solutions) == 1
+    assert examples.sat_utils.count_solutions(statement, cap=2) == 1
 
     readable_statement = examples._readable_cnf(solutions[0], separator="\n")
     assertions = readable_statement.split("\n")
@@ -26,3 +31,46 @@ def test_comets():
 
     for assertion in expected:
         assert assertion in assertions
+
+
+def test_puzzles_load_lazily():
+    """Assert the CLI only imports the puzzle it is asked to solve."""
+    code = (
+        "import sys, examples.__main__, examples.puzzles as p;"
+        "p.get('simple_lunch');"
+        "print(sorted(m for m in sys.modules if m.startswith('examples.puzzles.')))"  # noqa
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,  # noqa
+    ).stdout
+
+    assert output.strip() == "['examples.puzzles.simple_lunch']"
+
+
+def test_startup_skips_optional_modules():
+    """Assert solving a puzzle doesn't import what only some flags need."""
+    optional = (
+        "cProfile", "concurrent.futures", "examples.cache", "examples.metrics",  # noqa
+        "importlib.metadata", "mmap", "multiprocessing", "subprocess",
+        "tracemalloc",
+    )
+    code = (
+        "import sys, examples.__main__ as m;"
+        "m.main(['simple_lunch']);"
+        f"print([name for name in {optional!r} if name in sys.modules])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,  # noqa
+    ).stdout
+
+    assert output.splitlines()[-1] == "[]"
+
+
+def test_register_puzzle():
+    """Assert third parties can register puzzles by callable or path."""
+    examples.puzzles.register("lunch_again", "examples.puzzles.simple_lunch:simple_lunch")  # noqa
+    examples.puzzles.register("trivial", lambda: [("a",)])
+
+    assert "lunch_again" in examples.puzzles.names()
+    assert examples.puzzles.get("lunch_again") is examples.puzzles.simple_lunch.simple_lunch  # noqa
+    assert examples.sat_utils.solve_all(examples.puzzles.get("trivial")()) == [["a"]]  # noqa
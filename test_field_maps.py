@@ -0,0 +1,67 @@
+"""Tests for sat_examples/examples/puzzles/field_maps.py"""
+import fuzzywuzzy.process
+
+from benchmarks import generators
+from examples.puzzles import field_maps
+
+
+def _passing(scores):
+    return [score for score in scores if score[1] > field_maps.PASSING_SCORE]
+
+
+def test_index_matches_brute_force():
+    """Assert the shortlist never drops a pair process.extract would pass."""
+    source_fields, target_fields = generators.field_schema(60, seed=4)
+    labels = [str(field) for field in target_fields + field_maps.TARGET_FIELDS]  # noqa
+    index = field_maps.TargetIndex(labels)
+
+    for source_field in source_fields + field_maps.SOURCE_FIELDS:
+        query = str(source_field)
+        expected = _passing(fuzzywuzzy.process.extract(query, labels))
+        assert _passing(index.extract(query)) == expected
+
+
+def test_index_shortlists():
+    """Assert unrelated labels are never exactly scored."""
+    index = field_maps.TargetIndex(["sku", "vendor", "ZZZZZZZZZZZ"])
+
+    _query, shortlist = index.candidates("SKU")
+    assert [index.labels[i] for i in shortlist] == ["sku"]
+
+
+def test_best_maps():
+    """Assert the highest scoring one-to-one mapping ranks first."""
+    (score, solution), *others = field_maps.best_maps(top=3)
+
+    assert sorted(solution) == [
+        "AAAAAAAAAA -> NOTHING",
+        "Duplicate -> Duplicate",
+        "NOTHING -> ZZZZZZZZZZZ",
+        "Product Name -> name",
+        "SKU -> sku",
+        "Vendor Name -> vendor",
+    ]
+    assert [other[0] for other in others] == [score - 90, score - 90]
+
+
+def test_best_maps_scales():
+    """Assert a schema of realistic size maps one-to-one, beating greedy."""
+    source_fields, target_fields = generators.field_schema(80, seed=4)
+    passing = field_maps._passing_scores(source_fields, target_fields)
+
+    (score, solution), = field_maps.best_maps(source_fields, target_fields)
+
+    pairs = [mapping.split(" -> ") for mapping in solution]
+    sources = [source for source, _target in pairs if source != "NOTHING"]
+    targets = [target for _source, target in pairs if target != "NOTHING"]
+    assert len(sources) == len(set(sources)) == len(source_fields)
+    assert len(targets) == len(set(targets)) == len(target_fields)
+    # Take the best scoring pairs first, as long as both fields are free
+    greedy, used = 0, set()
+    for (source, target), pair_score in sorted(
+        passing.items(), key=lambda item: -item[1]
+    ):
+        if source not in used and target not in used:
+            greedy += pair_score
+            used.update((source, target))
+    assert score >= greedy
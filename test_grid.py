@@ -0,0 +1,87 @@
+"""Tests for sat_examples/examples/grid.py"""
+import pycosat
+
+from examples import sat_utils
+from examples.grid import Clue, LogicGrid
+
+
+def test_index_round_trips():
+    """Assert every triple has its own dense number and name."""
+    grid = LogicGrid(("a", "b", "c"), x=(1, 2, 3), y=("p", "q", "r", "s"))
+
+    nums = [
+        grid.index(subject, category, value)
+        for category, values in grid.categories.items()
+        for subject in grid.subjects
+        for value in values
+    ]
+    assert nums == list(range(1, grid.num_vars + 1))
+    assert grid.triple(grid.index("b", "y", "s")) == ("b", "y", "s")
+    assert grid("c", "x", 2) == "c x 2"
+
+
+def test_statement_numbers_grid_variables_densely():
+    """Assert the statement numbers grid variables by their index."""
+    grid = LogicGrid(("a", "b"), formatters={"x": lambda s, v: f"{s}={v}"}, x=(1, 2))  # noqa
+    statement = grid.statement()
+
+    assert statement.lit2num[grid("b", "x", 1)] == grid.index("b", "x", 1)
+    statement += [(grid("a", "x", 1),)]
+    assert len(grid.statement()) == len(statement) - 1
+
+    model = pycosat.solve(list(statement.numbered))
+    assert grid.records(model) == [grid.Record("a", 1), grid.Record("b", 2)]
+
+
+def test_uneven_categories():
+    """Assert extra values go unused and too few values are shared."""
+    grid = LogicGrid(("a", "b"), big=(1, 2, 3), small=("z",))
+    solutions = sat_utils.solve_all(grid.statement())
+
+    assert len(solutions) == 6
+    for solution in solutions:
+        records = grid.records(solution)
+        assert records[0].big != records[1].big
+        assert records[0].small == records[1].small == "z"
+
+
+def test_clues_compile_once_per_grid():
+    """Assert a clue runs once per equal grid and splices into statements."""
+    calls = list()
+
+    @Clue
+    def a_is_2(statement):
+        calls.append(statement)
+        statement += [(grid("a", "x", 2),)]
+
+    grid = LogicGrid(("a", "b"), x=(1, 2))
+    same_grid = LogicGrid(("a", "b"), x=(1, 2))
+    assert grid == same_grid and hash(grid) == hash(same_grid)
+
+    assert grid.compile(a_is_2) is same_grid.compile(a_is_2)
+    assert len(calls) == 1
+
+    statement = same_grid.assemble(a_is_2)
+    assert len(calls) == 1
+    assert sat_utils.solve_all(statement) == [["a x 2", "b x 1"]]
+
+
+def test_splice_renumbers_variables_outside_the_grid():
+    """Assert clues with their own variables splice in any order."""
+    grid = LogicGrid(("a", "b"), x=(1, 2))
+
+    @Clue
+    def a_is_1_or_b_is_1(statement):
+        statement += sat_utils.from_dnf(
+            [(grid("a", "x", 1),), (grid("b", "x", 1),)], tseitin=True,
+        )
+
+    @Clue
+    def b_is_blue(statement):
+        statement += [("b is blue",)]
+
+    statement = grid.assemble(b_is_blue, a_is_1_or_b_is_1)
+    assert sorted(map(sorted, sat_utils.solve_all(statement))) == [
+        ["a x 1", "b is blue", "b x 2"],
+        ["a x 2", "b is blue", "b x 1"],
+    ]
@@ -0,0 +1,37 @@
+"""Tests for sat_examples/examples/metrics.py"""
+import json
+
+import examples.__main__
+from examples import metrics
+from examples.puzzles import aerophobes
+
+
+def test_solve_all_records_phases():
+    """Assert every phase is measured, including nested per-clue phases."""
+    clues = (aerophobes.clue_1, aerophobes.clue_5)
+    build = lambda: aerophobes.aerophobes(*clues, states=False, charms=False)  # noqa
+    solutions, run_metrics = metrics.solve_all(build)
+
+    phases = {phase.name: phase for phase in run_metrics.phases}
+    assert list(phases) == ["build", "clue_1", "clue_5", "translate", "solve", "decode"]  # noqa
+    assert phases["clue_1"].clauses == 1
+    assert phases["clue_1"].depth == 1
+    assert phases["translate"].clauses == phases["build"].clauses
+    assert phases["solve"].solutions == len(solutions)
+    assert all(phase.peak_bytes > 0 for phase in run_metrics.phases)
+
+
+def test_phase_without_metrics():
+    """Assert recording phases is a no-op when no Metrics are active."""
+    with metrics.phase("nothing") as phase:
+        assert phase is None
+
+
+def test_cli_metrics_json(capsys):
+    """Assert the CLI can report metrics as a JSON document."""
+    examples.__main__.main(["tfinley", "--metrics", "json"])
+
+    document = json.loads(capsys.readouterr().out)
+    assert document["puzzle"] == "tfinley"
+    assert document["solutions"] == 9
+    assert [p["name"] for p in document["phases"]] == ["build", "translate", "solve", "decode"]  # noqa
@@ -0,0 +1,666 @@
+"""Tests for sat_examples/examples/sat_utils.py"""
+import concurrent.futures
+import itertools
+import sys
+import time
+
+import pycosat
+import pytest
+
+from benchmarks import generators
+from examples import sat_utils
+
+
+ELEMENTS = tuple(f"x{i}" for i in range(6))
+
+
+def _brute_force(elements, predicate):
+    """Return the subsets of elements matching predicate, as sorted tuples."""
+    return sorted(
+        subset
+        for size in range(len(elements) + 1)
+        for subset in itertools.combinations(sorted(elements), size)
+        if predicate(size)
+    )
+
+
+def _answers(statement, elements):
+    """Solve statement, mentioning every element so none are left out."""
+    statement = statement + [(e, sat_utils.neg(e)) for e in elements]
+    return sorted(tuple(sorted(s)) for s in sat_utils.solve_all(statement))
+
+
+@pytest.mark.parametrize("encoding", sorted(sat_utils.ENCODINGS))
+@pytest.mark.parametrize("n", range(0, len(ELEMENTS) + 1))
+def test_q_encodings(encoding, n):
+    """Assert every encoding agrees with a brute force count."""
+    q = sat_utils.Q(ELEMENTS, encoding=encoding)
+
+    assert _answers(q <= n, ELEMENTS) == _brute_force(ELEMENTS, lambda s: s <= n)  # noqa
+    assert _answers(q >= n, ELEMENTS) == _brute_force(ELEMENTS, lambda s: s >= n)  # noqa
+    assert _answers(q == n, ELEMENTS) == _brute_force(ELEMENTS, lambda s: s == n)  # noqa
+
+
+def test_q_encodings_are_linear():
+    """Assert auxiliary encodings avoid the combinatorial clause explosion."""
+    elements = [f"x{i}" for i in range(40)]
+
+    assert len(sat_utils.Q(elements, encoding="pairwise") <= 3) == 91390
+    assert len(sat_utils.Q(elements, encoding="seqcounter") <= 3) < 40 * 4 * 4
+    assert len(sat_utils.Q(elements, encoding="totalizer") <= 3) < 40 * 4 * 4
+    assert len(sat_utils.Q(elements) <= 3) < 40 * 4 * 4
+
+
+def test_small_constraints_stay_pairwise():
+    """Assert the default encoding adds no auxiliaries to small groups."""
+    statement = sat_utils.one_of(ELEMENTS[:5])
+
+    assert not any(sat_utils.is_aux(lit) for clause in statement for lit in clause)  # noqa
+
+
+def test_unknown_encoding():
+    """Assert a bad encoding name is rejected."""
+    with pytest.raises(ValueError):
+        sat_utils.one_of(ELEMENTS, encoding="bogus")
+
+
+def test_from_dnf_tseitin():
+    """Assert the selector encoding has the same answers as distribution."""
+    dnf = [
+        ("a", "b"),
+        ("~a", "c", "d"),
+        ("b", "~c"),
+        ("d",),
+        ("a", "~a", "c"),
+    ]
+    elements = ("a", "b", "c", "d")
+
+    expected = _answers(sat_utils.from_dnf(dnf), elements)
+    assert _answers(sat_utils.from_dnf(dnf, tseitin=True), elements) == expected  # noqa
+
+
+def test_from_dnf_tseitin_is_linear():
+    """Assert many wide terms compile without a cartesian product."""
+    dnf = [tuple(f"v{term}_{i}" for i in range(4)) for term in range(40)]
+    statement = sat_utils.from_dnf(dnf, tseitin=True)
+
+    assert len(statement) == 40 * 5 + 1
+    assert len(sat_utils.solve_one(statement)) >= 4
+
+
+def test_var_pool():
+    """Assert pool literals solve like their string equivalents."""
+    pool = sat_utils.VarPool(formatter=lambda name, month: f"{name} traveled in {month}")  # noqa
+    names, months = ("Brandi", "Lee", "Rudy"), ("March", "April", "May")
+
+    statement = [(-pool("Brandi", "March"),)]
+    for name in names:
+        statement += sat_utils.one_of(
+            (pool(name, month) for month in months),
+            encoding="seqcounter", pool=pool,
+        )
+    for month in months:
+        statement += sat_utils.one_of(
+            (pool(name, month) for name in names),
+            encoding="totalizer", pool=pool,
+        )
+    statement += sat_utils.from_dnf(
+        [(pool("Lee", "April"), pool("Rudy", "May")), (pool("Lee", "May"),)],
+        tseitin=True, pool=pool,
+    )
+
+    solutions = sat_utils.solve_all(statement, pool=pool)
+
+    assert len(solutions) == 1
+    assert sorted(solutions[0]) == [
+        "Brandi traveled in April",
+        "Lee traveled in May",
+        "Rudy traveled in March",
+    ]
+    for solution in solutions:
+        assert "Brandi traveled in March" not in solution
+        assert not any(sat_utils.is_aux(literal) for literal in solution)
+    assert pool.key(pool("Lee", "May")) == ("Lee", "May")
+
+
+def test_var_pool_unused_variables():
+    """Assert pool variables a cnf doesn't mention aren't free in it."""
+    pool = sat_utils.VarPool()
+    a, b, c = pool("a"), pool("b"), pool("c")
+    sat_utils.at_most([pool("d", i) for i in range(8)], 2, pool=pool)
+    statement = [(a,), (c,)]
+
+    assert sat_utils.solve_all(statement, pool=pool) == [["a", "c"]]
+    assert sat_utils.count_solutions(statement, pool=pool) == 1
+    assert sat_utils.backbone(statement, pool=pool) == ["a", "c"]
+    assert sat_utils.solve_all(statement, pool=pool, project=[c]) == [["c"]]
+    with pytest.raises(ValueError):
+        sat_utils.solve_all(statement, pool=pool, project=[b])
+
+    pytest.importorskip("numpy")
+    matrix, columns = sat_utils.solve_all(statement, pool=pool, as_array=True)
+    assert columns == ["a", "c"] and matrix.tolist() == [[True, True]]
+
+
+def test_var_pool_required_for_auxiliaries():
+    """Assert integer literals cannot borrow string auxiliaries."""
+    with pytest.raises(ValueError):
+        sat_utils.one_of(range(1, 10), encoding="seqcounter")
+
+
+def test_cnf_buffer():
+    """Assert a buffer stores DIMACS-style literals and solves like a list."""
+    statement = sat_utils.one_of(["a", "b", "c"]) + [("~a", "d")]
+    buffer = sat_utils.CNFBuffer()
+    buffer += statement
+
+    assert len(buffer) == len(statement) and list(buffer) == statement
+    assert buffer.literals.count(0) == len(statement)
+    assert buffer.literals[-3:].tolist() == [-1, 4, 0]
+
+    numbered_cnf, num2var = sat_utils.translate(buffer)
+    assert numbered_cnf == sat_utils.translate(statement)[0]
+    assert num2var is buffer.num2var
+    assert list(pycosat.itersolve(numbered_cnf)) == list(pycosat.itersolve(sat_utils.translate(statement)[0]))  # noqa
+    assert sat_utils.solve_all(buffer) == sat_utils.solve_all(statement)
+
+
+def test_cnf_buffer_pool_literals():
+    """Assert VarPool literals are named by their pool, or rejected."""
+    pool = sat_utils.VarPool()
+    names = [pool("Ann", color) for color in ("red", "blue", "green")]
+    statement = sat_utils.one_of(names, encoding="seqcounter", pool=pool)
+
+    buffer = sat_utils.CNFBuffer(statement, pool=pool)
+    buffer += [("Ann red", "Ann blue")]
+    assert sorted(map(sorted, sat_utils.solve_all(buffer))) == [
+        ["Ann blue"], ["Ann red"],
+    ]
+    assert sat_utils.Solver(statement, pool=pool).solve_all() == (
+        sat_utils.solve_all(statement, pool=pool)
+    )
+    assert sat_utils.Solver(statement, pool=pool).solve_all(
+        project=names[:1],
+    ) in ([["Ann red"], []], [[], ["Ann red"]])
+    with pytest.raises(ValueError, match="pool="):
+        sat_utils.CNFBuffer([(1, -2)])
+    with pytest.raises(ValueError, match="pool="):
+        sat_utils.Solver([(1, -2)])
+
+
+def test_cnf_buffer_held_views():
+    """Assert a refused append leaves no half-declared variables behind."""
+    buffer = sat_utils.CNFBuffer(sat_utils.one_of(["a", "b"]))
+    clauses = list(sat_utils.translate(buffer)[0])
+
+    with pytest.raises(BufferError):
+        buffer += [("~a", "c")]
+    with pytest.raises(BufferError):
+        buffer.splice(sat_utils.CNFBuffer([("d", "e")]).literals, ("d", "e"))
+    assert "c" not in buffer.lit2num and "d" not in buffer.lit2num
+    assert len(buffer.num2var) == 4 and len(buffer) == 2
+
+    del clauses
+    buffer += [("~a", "c")]
+    assert buffer.lit2num["c"] == 3
+    assert sorted(map(sorted, sat_utils.solve_all(buffer))) == [
+        ["a", "c"], ["b"], ["b", "c"],
+    ]
+
+
+def test_pool_auxiliaries_stay_apart():
+    """Assert pool and symbolic auxiliaries sharing a buffer don't merge."""
+    pool = sat_utils.VarPool()
+    xs = [pool("x", i) for i in range(12)]
+    ys = [f"y{i}" for i in range(12)]
+    buffer = sat_utils.CNFBuffer(pool=pool)
+    buffer += sat_utils.at_most(xs, 2, "seqcounter", pool=pool)
+    buffer += sat_utils.at_most(ys, 2, "seqcounter")
+
+    assert len(buffer.num2var) // 2 == 70
+    assert sat_utils.count_solutions(buffer) == 79 ** 2
+
+    solver = sat_utils.Solver(
+        sat_utils.at_most(xs, 2, "seqcounter", pool=pool), pool=pool,
+    )
+    solver.add(sat_utils.at_most(ys, 2, "seqcounter"))
+    assert sat_utils.count_solutions(solver.buffer) == 79 ** 2
+
+
+def test_solver_push_pop():
+    """Assert checkpoints roll back both clauses and new literals."""
+    solver = sat_utils.Solver(sat_utils.one_of(["a", "b", "c"]))
+    base = sorted(map(sorted, solver.solve_all()))
+
+    solver.push()
+    solver.add([("~a",), ("d", "~b")])
+    assert sorted(map(sorted, solver.solve_all())) == [["b", "d"], ["c"], ["c", "d"]]  # noqa
+
+    solver.pop()
+    assert "d" not in solver.lit2num
+    assert sorted(map(sorted, solver.solve_all())) == base
+
+    solver.add([("~c",)])
+    assert sorted(map(sorted, solver.solve_all())) == [["a"], ["b"]]
+
+
+def test_solver_matches_solve_all():
+    """Assert an incremental session agrees with a one-shot solve."""
+    statement = sat_utils.one_of(ELEMENTS, encoding="totalizer")
+    solver = sat_utils.Solver()
+    for clause in statement:
+        solver.add([clause])
+
+    assert sorted(map(sorted, solver.solve_all())) == sorted(map(sorted, sat_utils.solve_all(statement)))  # noqa
+
+
+def test_projected_itersolve():
+    """Assert projection yields each distinct answer over the subset once."""
+    statement = sat_utils.one_of(["a", "b"]) + [("c", "d", "e")]
+
+    assert len(sat_utils.solve_all(statement)) == 2 * 7
+    solutions = sat_utils.solve_all(statement, project=["a", "b"])
+    assert sorted(map(sorted, solutions)) == [["a"], ["b"]]
+
+    solutions = sat_utils.solve_all(statement, include_neg=True, project=["~a"])  # noqa
+    assert sorted(map(sorted, solutions)) == [["a"], ["~a"]]
+
+    solver = sat_utils.Solver(statement)
+    assert len(solver.solve_all(project=["c", "d"])) == 4
+
+    with pytest.raises(ValueError):
+        sat_utils.solve_all(statement, project=["z"])
+
+
+def test_parallel_solve_all():
+    """Assert splitting across workers finds the same solutions."""
+    names, months = ("a", "b", "c", "d"), ("1", "2", "3", "4")
+    statement = []
+    for name in names:
+        statement += sat_utils.one_of(f"{name}{month}" for month in months)
+    for month in months:
+        statement += sat_utils.one_of(f"{name}{month}" for name in names)
+
+    serial = sorted(map(sorted, sat_utils.solve_all(statement)))
+    parallel = sat_utils.solve_all(statement, workers=2)
+    assert len(serial) == 24
+    assert sorted(map(sorted, parallel)) == serial
+
+    project = [f"a{month}" for month in months]
+    parallel = sat_utils.solve_all(statement, project=project, workers=2)
+    assert sorted(map(sorted, parallel)) == [[p] for p in project]
+
+
+def test_parallel_close_stops_workers():
+    """Assert abandoning a parallel enumeration doesn't wait for the cubes."""
+    statement = sat_utils.Q([f"v{i}" for i in range(28)]) <= 5
+    solutions = sat_utils.itersolve(statement, workers=2)
+    assert next(solutions)
+
+    start = time.perf_counter()
+    solutions.close()
+    assert time.perf_counter() - start < 5
+
+
+def test_parallel_streams_batches():
+    """Assert small batches still stream back every model once."""
+    statement = sat_utils.at_most(ELEMENTS, 2, "totalizer")
+    numbered_cnf, _ = sat_utils.translate(statement)
+    serial = sorted(map(sorted, pycosat.itersolve(numbered_cnf)))
+
+    parallel = sat_utils.iter_parallel(numbered_cnf, 2, batch=3)
+    assert sorted(map(sorted, parallel)) == serial
+
+
+def _attached_clauses(handle):
+    buffer = sat_utils.ClauseBuffer.attach(handle)
+    clauses = [tuple(clause) for clause in buffer]
+    buffer.close()
+    return clauses
+
+
+def test_clause_buffer():
+    """Assert a flat buffer solves like its clauses, here or in a worker."""
+    statement = sat_utils.Q(ELEMENTS) == 2
+    numbered_cnf, _num2var = sat_utils.translate(statement)
+    buffer = sat_utils.ClauseBuffer.from_clauses(numbered_cnf)
+
+    assert len(buffer) == len(numbered_cnf) and buffer[3] == numbered_cnf[3]
+    assert list(pycosat.itersolve(buffer)) == list(pycosat.itersolve(numbered_cnf))  # noqa
+
+    with buffer.share() as shared, \
+            concurrent.futures.ProcessPoolExecutor(1) as executor:
+        attached = executor.submit(_attached_clauses, shared.handle).result()
+    assert attached == numbered_cnf
+
+
+def test_dimacs_round_trip(tmp_path):
+    """Assert a symbolic cnf survives a trip through a DIMACS file."""
+    statement = sat_utils.one_of(["a", "b", "c"]) + [("~a", "d")]
+    path = tmp_path / "statement.cnf"
+
+    num2var = sat_utils.write_dimacs(statement, path)
+    numbered_cnf, read_num2var = sat_utils.read_dimacs(path)
+
+    assert path.read_text().startswith("p cnf 4")
+    assert read_num2var == num2var
+    assert [tuple(num2var[n] for n in clause) for clause in numbered_cnf] == statement  # noqa
+
+
+def test_read_dimacs_without_symbols(tmp_path):
+    """Assert foreign DIMACS files with comments and wrapped clauses parse."""
+    path = tmp_path / "foreign.cnf"
+    path.write_text("c a comment\np cnf 3 2\n1 -2\n 3 0 -1 0\n")
+
+    numbered_cnf, num2var = sat_utils.read_dimacs(path)
+
+    assert numbered_cnf == [(1, -2, 3), (-1,)]
+    assert num2var[-2] == "~2"
+
+
+def test_simplify():
+    """Assert duplicates, units, subsumed and pure clauses are removed."""
+    statement = [
+        ("a", "b"),
+        ("b", "a"),
+        ("a", "~a", "e"),
+        ("~a",),
+        ("b", "c", "d"),
+        ("c", "d"),
+        ("~c", "~d"),
+    ]
+    simplified = sat_utils.simplify(statement, pure_literals=False)
+
+    assert simplified.units == ["~a", "b"]
+    assert sorted(map(sorted, simplified.cnf)) == [["c", "d"], ["~c", "~d"]]
+    assert simplified.free == ["e"]
+
+    expected = sorted(map(sorted, sat_utils.solve_all(statement)))
+    assert sorted(map(sorted, simplified.itersolve(expand=True))) == expected
+
+    simplified = sat_utils.simplify([("a", "b"), ("a", "~c"), ("~b", "c")])
+    assert simplified.cnf == [] and simplified.pure == ["a", "~b"]
+    assert simplified.free == ["c"]
+    assert simplified.extend([], include_neg=True) == ["a", "~b", "~c"]
+
+
+def test_simplify_conflict():
+    """Assert a contradiction collapses to the empty clause."""
+    simplified = sat_utils.simplify([("a",), ("~a", "b"), ("~b",)])
+
+    assert simplified.cnf == [()]
+    assert list(simplified.itersolve()) == []
+
+
+def test_maxsat_matches_brute_force():
+    """Assert the cheapest models are found, in order of cost."""
+    hard = sat_utils.at_most(ELEMENTS, 3)
+    soft = [
+        (weight, clause)
+        for weight, clause in zip(
+            (2, 4, 6, 2, 8, 4, 2),
+            [(e,) for e in ELEMENTS] + [("~x0", "~x1")],
+        )
+    ]
+
+    def cost(subset):
+        model = set(subset)
+        return sum(
+            weight for weight, clause in soft
+            if not any(
+                lit[1:] not in model if lit.startswith("~") else lit in model
+                for lit in clause
+            )
+        )
+
+    costs = sorted(
+        cost(subset) for subset in _brute_force(ELEMENTS, lambda n: n <= 3)
+    )
+    ranked = sat_utils.maxsat(hard, soft, top=5)
+
+    assert [c for c, _solution in ranked] == costs[:5]
+    assert all(cost(solution) == c for c, solution in ranked)
+    assert sat_utils.maxsat([("a",), ("~a",)], [(1, ("a",))]) == []
+
+
+def test_maxsat_sums_wide_weights():
+    """Assert weights with many bits are summed exactly, carries and all."""
+    hard = sat_utils.one_of(ELEMENTS[:3]) + sat_utils.at_most(ELEMENTS, 4)
+    weights = (97, 64, 31, 50, 13, 88, 127)
+    soft = list(zip(weights, [(e,) for e in ELEMENTS] + [("~x0", "~x5")]))
+
+    def cost(model):
+        return sum(
+            weight for weight, (lit,) in soft[:-1] if lit not in model
+        ) + (weights[-1] if {"x0", "x5"} <= set(model) else 0)
+
+    models = [
+        subset
+        for subset in _brute_force(ELEMENTS, lambda n: n <= 4)
+        if sum(e in subset for e in ELEMENTS[:3]) == 1
+    ]
+    ranked = sat_utils.maxsat(hard, soft, top=len(models) + 1)
+
+    assert [c for c, _solution in ranked] == sorted(map(cost, models))
+    assert all(cost(solution) == c for c, solution in ranked)
+
+
+FAKE_SOLVER = '''
+import sys
+import pycosat
+clauses = [
+    [int(n) for n in line.split()[:-1]]
+    for line in sys.stdin if line.strip() and line[0] not in "cp"
+]
+solution = pycosat.solve(clauses)
+if solution == "UNSAT":
+    print("s UNSATISFIABLE")
+    sys.exit(20)
+print("c a comment the backend should skip")
+print("s SATISFIABLE")
+for start in range(0, len(solution), 3):
+    print("v", *solution[start:start + 3])
+print("v 0")
+sys.exit(10)
+'''
+
+
+@pytest.fixture
+def dimacs_backend(tmp_path):
+    script = tmp_path / "fake_solver.py"
+    script.write_text(FAKE_SOLVER)
+    return sat_utils.DimacsBackend([sys.executable, str(script)])
+
+
+def test_dimacs_backend(dimacs_backend):
+    """Assert a DIMACS subprocess solves like the pycosat backend."""
+    statement = sat_utils.Q(ELEMENTS[:4]) == 2
+    expected = sorted(map(sorted, sat_utils.solve_all(statement)))
+
+    solutions = sat_utils.solve_all(statement, backend=dimacs_backend)
+    assert sorted(map(sorted, solutions)) == expected
+    assert dimacs_backend.count(sat_utils.translate(statement)[0]) == 6
+    assert sat_utils.solve_all(
+        statement, project=["x0"], backend=dimacs_backend,
+    ) in ([["x0"], []], [[], ["x0"]])
+
+    buffer = sat_utils.CNFBuffer(statement)
+    solutions = dimacs_backend.itersolve(buffer.numbered)
+    assert next(solutions)
+    buffer += [("x0", "x5")]            # Not refused for views held above
+
+    unsat = [("a",), ("~a",)]
+    assert sat_utils.solve_all(unsat, backend=dimacs_backend) == []
+    assert sat_utils.Solver(unsat, dimacs_backend).solve_all() == []
+
+
+def test_dimacs_backend_chatty_solver(tmp_path):
+    """Assert a solver that writes before reading all its input can't stall."""
+    script = tmp_path / "chatty_solver.py"
+    script.write_text(
+        'import sys\nprint("c " + "x" * 99, flush=True)\n' * 2000
+        + FAKE_SOLVER
+    )
+    backend = sat_utils.DimacsBackend([sys.executable, str(script)])
+    statement = [(f"a{i}", f"~b{i}", f"c{i}") for i in range(20000)]
+
+    true = set(sat_utils.solve_one(statement, backend=backend))
+    assert all(
+        any(lit in true or lit[0] == "~" and lit[1:] not in true for lit in clause)  # noqa
+        for clause in statement
+    )
+
+
+def test_dimacs_backend_failure():
+    """Assert a solver that reports nothing raises instead of passing."""
+    backend = sat_utils.DimacsBackend([sys.executable, "-c", "pass"])
+    with pytest.raises(RuntimeError):
+        sat_utils.solve_one([("a",)], backend=backend)
+
+
+def test_get_backend():
+    """Assert backends are looked up by name."""
+    assert sat_utils.get_backend() is sat_utils.BACKENDS["pycosat"]
+    assert sat_utils.get_backend("pycosat").solve([(1,), (-1,)]) is None
+    with pytest.raises(ValueError):
+        sat_utils.get_backend("nonesuch")
+
+
+def test_find_symmetries():
+    """Assert only permutations that preserve every clause are found."""
+    statement = sat_utils.one_of(["a", "b", "c"]) + [("d", "c")]
+    assert sat_utils.find_symmetries(statement) == [{"a": "b", "b": "a"}]
+    assert sat_utils.find_symmetries([("a", "~b"), ("b", "c")]) == []
+
+
+def test_find_symmetries_grid():
+    """Assert a clued logic grid's symmetries are found quickly and hold."""
+    statement = generators.logic_grid(8, clues=2)
+    clauses = {frozenset(clause) for clause in statement}
+
+    start = time.perf_counter()
+    found = sat_utils.find_symmetries(statement)
+    assert time.perf_counter() - start < 10
+
+    def image(literal, generator):
+        var = literal.lstrip("~")
+        return literal.replace(var, generator.get(var, var))
+
+    assert found
+    for generator in found:
+        assert {
+            frozenset(image(literal, generator) for literal in clause)
+            for clause in clauses
+        } == clauses
+
+
+def test_break_symmetries():
+    """Assert canonical solutions expand back to every solution."""
+    grid = [[f"{row}{col}" for col in "xyz"] for row in "abc"]
+    statement = list()
+    for line in grid + [list(col) for col in zip(*grid)]:
+        statement += sat_utils.one_of(line)
+    statement += [("~ax",)]
+
+    broken = sat_utils.break_symmetries(statement)
+    canonical = list(broken.itersolve())
+    expected = sorted(map(sorted, sat_utils.solve_all(statement)))
+
+    assert broken.generators and len(canonical) < len(expected)
+    assert sorted(map(sorted, broken.itersolve(expand=True))) == expected
+    assert sorted(map(sorted, broken.expand(canonical))) == expected
+
+
+@pytest.mark.parametrize("encoding", sorted(sat_utils.ENCODINGS))
+def test_count_solutions(encoding):
+    """Assert models are counted exactly, or up to the cap."""
+    statement = sat_utils.at_least(ELEMENTS, 2, encoding)
+    statement += [("x0", "x1"), ("~x4", "~x5")]
+    expected = len(sat_utils.solve_all(statement))
+
+    assert sat_utils.count_solutions(statement) == expected
+    assert sat_utils.count_solutions(statement, cap=2) == 2
+    assert sat_utils.count_solutions(statement, cap=10**6) == expected
+
+
+def test_count_solutions_edge_cases():
+    """Assert contradictions, units and numbered cnfs are counted."""
+    assert sat_utils.count_solutions([("a",), ("~a", "b"), ("~b",)]) == 0
+    assert sat_utils.count_solutions([("a",), ("a", "b")]) == 2
+    assert sat_utils.count_solutions([()]) == 0
+    assert sat_utils.count_solutions([]) == 1
+
+    pool = sat_utils.VarPool()
+    statement = sat_utils.one_of([pool("a"), pool("b"), pool("c")], pool=pool)
+    assert sat_utils.count_solutions(statement, pool=pool) == 3
+
+
+def test_count_solutions_long_chain():
+    """Assert a long chain of implications doesn't exhaust the stack."""
+    chain = [(f"~x{i}", f"x{i + 1}", f"y{i}") for i in range(600)]
+    assert sat_utils.count_solutions(chain, cap=2) == 2
+
+
+def test_solve_array(tmp_path):
+    """Assert the solution matrix matches solve_all, in memory or spilled."""
+    np = pytest.importorskip("numpy")
+    statement = sat_utils.at_most(ELEMENTS, 2, "totalizer")
+    expected = sorted(map(sorted, sat_utils.solve_all(statement)))
+
+    matrix, columns = sat_utils.solve_all(statement, as_array=True)
+    assert matrix.dtype == bool and sorted(columns) == list(ELEMENTS)
+    assert sorted(
+        sorted(c for c, true in zip(columns, row) if true) for row in matrix
+    ) == expected
+    assert matrix.sum(axis=0).tolist() == [6] * len(ELEMENTS)
+
+    spilled, _columns = sat_utils.solve_array(
+        statement, packed=True, spill=tmp_path / "solutions.bin", chunk_rows=5,
+    )
+    assert isinstance(spilled, np.memmap) and spilled.shape == (22, 1)
+    unpacked = np.unpackbits(spilled, axis=1, count=len(columns))
+    assert (unpacked.astype(bool) == matrix).all()
+
+    matrix, columns = sat_utils.solve_array(statement, project=["x1", "x0"])
+    assert columns == ["x1", "x0"] and matrix.shape == (4, 2)
+    matrix, _columns = sat_utils.solve_array([("a",), ("~a",)])
+    assert matrix.shape == (0, 1)
+
+
+def test_solve_batch():
+    """Assert a batch solves like solve_all, in order or as completed."""
+    statements = [sat_utils.Q(ELEMENTS[:n]) == 2 for n in range(2, 6)]
+    statements += [[("a",), ("~a",)], sat_utils.one_of(["a", "b"])]
+    expected = [sat_utils.solve_all(statement) for statement in statements]
+
+    assert list(sat_utils.solve_batch(statements, workers=2)) == expected
+    unordered = sat_utils.solve_batch(
+        statements, workers=2, ordered=False, chunksize=4,
+    )
+    assert sorted(unordered) == list(enumerate(expected))
+
+
+def test_translate_reusing():
+    """Assert symbol tables are reused only for the same vocabulary."""
+    tables = list()
+    _cnf, num2var = sat_utils._translate_reusing([("a", "~b")], tables)
+    _cnf, reused = sat_utils._translate_reusing([("~b",), ("a",)], tables)
+    assert reused is num2var
+
+    numbered_cnf, fresh = sat_utils._translate_reusing([("a",)], tables)
+    assert fresh is not num2var and numbered_cnf == [(1,)]
+    assert len(tables) == 2
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 16])
+def test_backbone(chunk):
+    """Assert the backbone is what every solution agrees on."""
+    statement = sat_utils.at_most(ELEMENTS, 2, "totalizer")
+    statement += [("x0", "x1"), ("~x1", "x2"), ("~x4",)]
+    solutions = sat_utils.solve_all(statement, include_neg=True)
+    expected = set.intersection(*map(set, solutions))
+
+    forced = sat_utils.backbone(statement, chunk=chunk)
+    assert set(forced) == expected
+    assert sat_utils.backbone(sat_utils.CNFBuffer(statement), chunk=chunk) == forced  # noqa
+    assert sat_utils.backbone([("a",), ("~a",)]) is None